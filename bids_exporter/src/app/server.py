@@ -1,19 +1,36 @@
 import asyncio
+import multiprocessing
 import os
+import shutil
+import time
+from collections.abc import AsyncIterator, Generator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from functools import partial
 from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
 from uuid import UUID, uuid4
 
-from fastapi import BackgroundTasks, FastAPI, HTTPException, Response
-from fastapi.responses import StreamingResponse
+import anyio
+import anyio.to_thread
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
 from minio.error import S3Error
 
 from ..config.env import settings
 from ..domain.bids import create_bids_dataset
-from ..domain.tasks import create_task_in_db, get_task_status
+from ..domain.tasks import create_task_in_db, get_task_status, update_task_status
+from ..infrastructure.db import close_db_pool
 from ..infrastructure.object_storage import (
     BIDS_BUCKET,
     check_object_storage_connection,
+    close_object_storage_connections,
+    iter_object_ranges,
     object_storage_client,
+    public_object_storage_client,
 )
 from .schemas import (
     ExportResponse,
@@ -24,39 +41,116 @@ from .schemas import (
 )
 
 EXPORT_OUTPUT_DIR = Path(settings.export_output_dir)
+# ZIPエクスポートはタスク毎、解析用は実験毎のディレクトリに書き出し、並行するビルド同士が
+# 同じ bids_dataset を消し合わないようにする
+ZIP_EXPORT_DIR = EXPORT_OUTPUT_DIR / "exports"
+ANALYSIS_EXPORT_DIR = EXPORT_OUTPUT_DIR / "analysis"
+HEALTH_CHECK_CACHE_TTL_SECONDS = 5.0
+# nginx が /api/v1/export-tasks へのプロキシ時に付けるヘッダー (X-Accel-Redirect を処理できる印)
+ACCEL_REDIRECT_ENABLED_HEADER = "X-Accel-Redirect-Enabled"
 
-# Initialize FastAPI app
-app = FastAPI(title="BIDS Exporter Service")
+_storage_health: dict[str, Any] = {"checked_at": float("-inf"), "ok": False}
+
+
+# app.state 上のプール名 -> ワーカー数
+# 解析用の同期ビルドが長時間のZIPエクスポートの後ろで待たされないよう、プールを分ける
+EXPORT_POOL_WORKERS = {
+    "export_pool": settings.export_workers,
+    "analysis_pool": settings.analysis_export_workers,
+}
+
+
+def _create_export_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Create a worker pool that runs BIDS exports outside the API process."""
+    # fork では親プロセスのDB接続プールを引き継いでしまうため spawn で起動する
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
 
 
-@app.on_event("startup")
-async def startup_event():
-    """On startup, check the connection to the object storage and ensure the bucket exists."""
+def _report_export_failure(task_id: UUID, future: Future) -> None:
+    """Mark the task as failed if its worker process died before reporting the outcome."""
+    if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+        return
+    print(f"❌ Export worker for task {task_id} terminated unexpectedly.")
+    update_task_status(
+        task_id, status="failed", error_message="Export worker terminated unexpectedly."
+    )
+
+
+def _submit_export(pool_name: str, **kwargs) -> Future:
+    """Submit create_bids_dataset to the named pool, replacing the pool if it is broken."""
+    pool: ProcessPoolExecutor = getattr(app.state, pool_name)
     try:
-        await check_object_storage_connection()
+        return pool.submit(create_bids_dataset, **kwargs)
+    except BrokenProcessPool:
+        # 壊れたプールの管理スレッドや残ったワーカープロセスを解放してから作り直す
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = _create_export_pool(EXPORT_POOL_WORKERS[pool_name])
+        setattr(app.state, pool_name, pool)
+        return pool.submit(create_bids_dataset, **kwargs)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the export worker pools and check the object storage on startup,
+    then release the worker pools, DB pool and storage connections on shutdown.
+    """
+    for pool_name, max_workers in EXPORT_POOL_WORKERS.items():
+        setattr(app.state, pool_name, _create_export_pool(max_workers))
+    app.state.download_stream_limiter = anyio.CapacityLimiter(settings.download_stream_threads)
+    try:
+        # 起動時の1回だけなので、ブロッキング呼び出しをまとめて1スレッドで実行する
+        await asyncio.to_thread(check_object_storage_connection)
         EXPORT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     except Exception as e:
         print(f"FATAL: Could not connect to object storage on startup. {e}")
         # In a real-world scenario, you might want to exit if the object storage is unavailable.
         # os._exit(1)
 
+    try:
+        yield
+    finally:
+        # Tasks still queued are abandoned
+        for pool_name in EXPORT_POOL_WORKERS:
+            getattr(app.state, pool_name).shutdown(wait=False, cancel_futures=True)
+        close_db_pool()
+        close_object_storage_connections()
+
+
+# Initialize FastAPI app
+app = FastAPI(title="BIDS Exporter Service", lifespan=lifespan)
+
+
+async def _check_object_storage_health() -> bool:
+    """Return whether the BIDS bucket is reachable, reusing a result younger than the TTL."""
+    now = time.monotonic()
+    if now - _storage_health["checked_at"] < HEALTH_CHECK_CACHE_TTL_SECONDS:
+        return _storage_health["ok"]
 
-@app.get("/health", response_model=HealthResponse, tags=["Health"])
-async def health_check(response: Response):
-    """A simple endpoint to confirm the service is running for health checks."""
     try:
-        # オブジェクトストレージ接続チェック
         loop = asyncio.get_event_loop()
         storage_ok = await loop.run_in_executor(
             None, lambda: object_storage_client.bucket_exists(BIDS_BUCKET)
         )
-        if not storage_ok:
-            response.status_code = 503
-            return HealthResponse(status="unhealthy")
-        return HealthResponse(status="ok")
     except Exception:
+        storage_ok = False
+
+    _storage_health["checked_at"] = now
+    _storage_health["ok"] = storage_ok
+    return storage_ok
+
+
+@app.get("/health", response_model=HealthResponse, tags=["Health"])
+async def health_check(response: Response):
+    """A simple endpoint to confirm the service is running for health checks."""
+    # オブジェクトストレージ接続チェック (プローブ毎に問い合わせないよう短時間キャッシュする)
+    if not await _check_object_storage_health():
         response.status_code = 503
         return HealthResponse(status="unhealthy")
+    return HealthResponse(status="ok")
 
 
 @app.get("/api/v1/health", response_model=HealthResponse, tags=["Health"])
@@ -70,23 +164,27 @@ async def health_check_v1(response: Response):
     response_model=ExportResponse,
     status_code=202,
 )
-async def start_export(experiment_id: UUID, background_tasks: BackgroundTasks):
+async def start_export(experiment_id: UUID):
     """
     Starts a new BIDS export task for a given experiment, compressing the result into a ZIP file.
-    The actual processing is done in the background.
+    The actual processing is done in a separate worker process.
     """
     task_id = uuid4()
 
     create_task_in_db(task_id, experiment_id)
 
-    # Schedule the background task with zip_output=True
-    background_tasks.add_task(
-        create_bids_dataset,
+    # Run the export with zip_output=True in the export worker pool
+    output_dir = ZIP_EXPORT_DIR / str(task_id)
+    future = _submit_export(
+        "export_pool",
         experiment_id=experiment_id,
         task_id=task_id,
-        output_dir=EXPORT_OUTPUT_DIR,
+        output_dir=output_dir,
         zip_output=True,
     )
+    future.add_done_callback(partial(_report_export_failure, task_id))
+    # アップロード後はタスク用ディレクトリごと不要になる
+    future.add_done_callback(lambda _: shutil.rmtree(output_dir, ignore_errors=True))
 
     status_url = f"/api/v1/export-tasks/{task_id}"
     return ExportResponse(
@@ -108,11 +206,33 @@ def get_export_status(task_id: UUID):
     return task
 
 
+async def _iterate_in_download_threads(
+    chunks: Generator[bytes, None, None],
+) -> AsyncIterator[bytes]:
+    """
+    Drive a blocking download generator on the dedicated download thread limiter so that
+    long-running downloads cannot exhaust the threadpool shared with sync endpoints.
+    """
+    limiter = app.state.download_stream_limiter
+    try:
+        while True:
+            chunk = await anyio.to_thread.run_sync(next, chunks, None, limiter=limiter)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # Release the storage connection even when the client disconnects mid-stream
+        with anyio.CancelScope(shield=True):
+            await anyio.to_thread.run_sync(chunks.close, limiter=limiter)
+
+
 @app.get("/api/v1/export-tasks/{task_id}/download")
-def download_export(task_id: UUID):
+def download_export(task_id: UUID, request: Request):
     """
-    Downloads the completed BIDS dataset by streaming it from the object storage
-    through this service.
+    Downloads the completed BIDS dataset. With a public object storage URL configured the client
+    is redirected to a presigned URL; behind nginx the transfer is delegated via X-Accel-Redirect;
+    otherwise the file is streamed from the object storage through this service, fetching large
+    files as parallel byte ranges.
     """
     task = get_task_status(task_id)
     if task is None:
@@ -127,26 +247,77 @@ def download_export(task_id: UUID):
             detail=f"Task is not complete. Current status: {task.status}",
         )
 
+    object_name = os.path.basename(task.result_file_path)
     try:
-        headers = {
-            "Content-Disposition": (
-                f'attachment; filename="{os.path.basename(task.result_file_path)}"'
-            )
+        headers = {"Content-Disposition": f'attachment; filename="{object_name}"'}
+        presigned_response_headers = {
+            "response-content-disposition": headers["Content-Disposition"],
+            "response-content-type": "application/zip",
         }
 
-        # Generator function to stream the file from the object storage
-        def stream_object_storage_object(bucket: str, object_name: str):
-            response = None
-            try:
-                response = object_storage_client.get_object(bucket, object_name)
-                yield from response.stream(32 * 1024)
-            finally:
-                if response:
+        if public_object_storage_client is not None:
+            # クライアントをオブジェクトストレージへ直接リダイレクトし、本サービスを経由させない
+            # (署名前に存在確認して 404 を返せるようにする)
+            object_storage_client.stat_object(BIDS_BUCKET, object_name)
+            return RedirectResponse(
+                public_object_storage_client.presigned_get_object(
+                    BIDS_BUCKET,
+                    object_name,
+                    expires=timedelta(minutes=15),
+                    response_headers=presigned_response_headers,
+                ),
+                status_code=307,
+            )
+
+        if (
+            settings.download_accel_redirect_prefix
+            and request.headers.get(ACCEL_REDIRECT_ENABLED_HEADER) == "1"
+        ):
+            # nginx に転送を任せる: 署名付きURLを内部ロケーション経由で取得させる
+            # (nginx を経由しないリクエストに空のボディを返さないよう、ヘッダーで経由を確認する)
+            object_storage_client.stat_object(BIDS_BUCKET, object_name)
+            presigned_url = urlsplit(
+                object_storage_client.presigned_get_object(
+                    BIDS_BUCKET,
+                    object_name,
+                    expires=timedelta(minutes=5),
+                    response_headers=presigned_response_headers,
+                )
+            )
+            headers["X-Accel-Redirect"] = (
+                f"{settings.download_accel_redirect_prefix}"
+                f"{presigned_url.path}?{presigned_url.query}"
+            )
+            return Response(status_code=200, media_type="application/zip", headers=headers)
+
+        # Look the object up before responding so that a missing key still becomes a 404
+        object_size = object_storage_client.stat_object(BIDS_BUCKET, object_name).size
+        headers["Content-Length"] = str(object_size)
+
+        if object_size > settings.download_range_part_bytes:
+            # 大きなアーカイブは複数のレンジGETを並列に先読みし、順番に返す
+            chunks = iter_object_ranges(
+                BIDS_BUCKET,
+                object_name,
+                object_size,
+                settings.download_range_part_bytes,
+                settings.download_range_workers,
+            )
+        else:
+            response = object_storage_client.get_object(BIDS_BUCKET, object_name)
+
+            # Generator function to stream the file from the object storage
+            def stream_object_storage_object() -> Generator[bytes, None, None]:
+                try:
+                    yield from response.stream(settings.download_stream_chunk_bytes)
+                finally:
                     response.close()
                     response.release_conn()
 
+            chunks = stream_object_storage_object()
+
         return StreamingResponse(
-            stream_object_storage_object(BIDS_BUCKET, os.path.basename(task.result_file_path)),
+            _iterate_in_download_threads(chunks),
             media_type="application/zip",
             headers=headers,
         )
@@ -170,7 +341,8 @@ async def create_bids_for_analysis(request: InternalBidsRequest):
     """
     An internal endpoint that creates a BIDS dataset without zipping it,
     saving it to a shared volume for another service to analyze.
-    This is a synchronous, blocking call intended for service-to-service communication.
+    The caller waits for the dataset, but the build runs in the export worker pool
+    so the event loop keeps serving other requests.
     """
     task_id = uuid4()  # Create a temporary task ID for logging/tracking
     print(
@@ -178,12 +350,15 @@ async def create_bids_for_analysis(request: InternalBidsRequest):
         f"Task: {task_id}, Exp: {request.experiment_id}"
     )
     try:
-        # Call the logic function directly with zip_output=False
-        output_path = create_bids_dataset(
-            experiment_id=request.experiment_id,
-            task_id=task_id,
-            output_dir=EXPORT_OUTPUT_DIR,
-            zip_output=False,
+        # Run the export with zip_output=False in the dedicated analysis pool and wait for it
+        output_path = await asyncio.wrap_future(
+            _submit_export(
+                "analysis_pool",
+                experiment_id=request.experiment_id,
+                task_id=task_id,
+                output_dir=ANALYSIS_EXPORT_DIR / str(request.experiment_id),
+                zip_output=False,
+            )
         )
         if not output_path:
             raise HTTPException(
@@ -42,11 +42,16 @@ def _get_int(name: str, default: int) -> int:
 @dataclass(frozen=True)
 class Settings:
     database_url: str = _get_env("DATABASE_URL", required=True)
+    db_pool_min_connections: int = _get_int("DB_POOL_MIN_CONNECTIONS", 1)
+    db_pool_max_connections: int = _get_int("DB_POOL_MAX_CONNECTIONS", 16)
     object_storage_endpoint: str = _get_env("OBJECT_STORAGE_ENDPOINT", "object-storage")
     object_storage_port: int = _get_int("OBJECT_STORAGE_PORT", 8333)
     object_storage_access_key: str = _get_env("OBJECT_STORAGE_ACCESS_KEY", required=True)
     object_storage_secret_key: str = _get_env("OBJECT_STORAGE_SECRET_KEY", required=True)
     object_storage_use_ssl: bool = _get_bool("OBJECT_STORAGE_USE_SSL", False)
+    object_storage_max_connections: int = _get_int("OBJECT_STORAGE_MAX_CONNECTIONS", 32)
+    object_storage_public_url: str = _get_env("OBJECT_STORAGE_PUBLIC_URL", "")
+    object_storage_region: str = _get_env("OBJECT_STORAGE_REGION", "us-east-1")
     object_storage_raw_data_bucket: str = _get_env("OBJECT_STORAGE_RAW_DATA_BUCKET", required=True)
     object_storage_media_bucket: str = _get_env("OBJECT_STORAGE_MEDIA_BUCKET", required=True)
     object_storage_bids_exports_bucket: str = _get_env(
@@ -54,6 +59,28 @@ class Settings:
         "bids-exports",
     )
     export_output_dir: str = _get_env("EXPORT_OUTPUT_DIR", "/export_data")
+    # nginx の内部ロケーション (nginx/nginx.conf の /_object_storage/) へのプレフィックス。
+    # nginx が付ける X-Accel-Redirect-Enabled ヘッダー付きのリクエストにだけ X-Accel-Redirect で
+    # 応答し、それ以外 (ポートへの直接アクセスなど) は本サービスからストリーミングする。
+    # 署名付きURLは OBJECT_STORAGE_ENDPOINT:OBJECT_STORAGE_PORT をホストとして署名されるため、
+    # nginx がオブジェクトストレージへ送る Host ヘッダーはこれと一致している必要がある
+    download_accel_redirect_prefix: str = _get_env("DOWNLOAD_ACCEL_REDIRECT_PREFIX", "")
+    download_stream_chunk_bytes: int = _get_int("DOWNLOAD_STREAM_CHUNK_BYTES", 256 * 1024)
+    download_stream_threads: int = _get_int("DOWNLOAD_STREAM_THREADS", 16)
+    download_range_part_bytes: int = _get_int("DOWNLOAD_RANGE_PART_BYTES", 8 * 1024 * 1024)
+    download_range_workers: int = _get_int("DOWNLOAD_RANGE_WORKERS", 4)
+    # ZIPエクスポートと解析用の同期ビルドは別プールで動く (各ワーカーが1プロセスを占有する)。
+    # EXPORT_WORKERS を超えるZIPエクスポートは先行分が終わるまで待たされるため、既定では
+    # CPU数 (最大4) だけ並行に実行する。1 にすると全エクスポートが1件ずつ順に処理される。
+    # 解析用は erp_neuro_marketing の BIDS_REQUEST_TIMEOUT_SECONDS 内に終わる必要があるため、
+    # 同時に解析する実験数に合わせて ANALYSIS_EXPORT_WORKERS を増やす
+    export_workers: int = _get_int("EXPORT_WORKERS", min(os.cpu_count() or 1, 4))
+    analysis_export_workers: int = _get_int("ANALYSIS_EXPORT_WORKERS", 1)
+    raw_object_fetch_workers: int = _get_int("RAW_OBJECT_FETCH_WORKERS", 8)
+    stimulus_fetch_workers: int = _get_int("STIMULUS_FETCH_WORKERS", 8)
+    task_status_flush_interval_seconds: float = _get_float(
+        "TASK_STATUS_FLUSH_INTERVAL_SECONDS", 1.0
+    )
     channel_zero_ratio_threshold: float = _get_float("CHANNEL_ZERO_RATIO_THRESHOLD", 0.98)
     channel_flatline_ptp_threshold: int = _get_int("CHANNEL_FLATLINE_PTP_THRESHOLD", 5)
     channel_bad_impedance_threshold: int = _get_int("CHANNEL_BAD_IMPEDANCE_THRESHOLD", 200)
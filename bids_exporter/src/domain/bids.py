@@ -1,16 +1,22 @@
+import csv
 import json
 import os
 import shutil
 import struct
+import threading
+import zipfile
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import TypedDict
+from types import MappingProxyType
+from typing import Any, TypedDict
 from uuid import UUID
 
-import mne
 import numpy as np
-import pandas as pd
-from mne_bids import BIDSPath, write_raw_bids
 
 from ..config.env import settings
 from ..infrastructure.db import get_db_connection, get_db_cursor
@@ -22,6 +28,25 @@ from ..infrastructure.object_storage import (
 )
 from .tasks import update_task_status
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency guard
+    orjson = None  # type: ignore[assignment]
+
+ARCHIVE_UPLOAD_PART_SIZE = 16 * 1024 * 1024
+ARCHIVE_DEFLATED_SUFFIXES = frozenset({".json", ".tsv", ".vhdr", ".vmrk", ".txt", ".md"})
+
+CHANNEL_TYPE_CODES = MappingProxyType({"eeg": 0, "emg": 1, "eog": 2, "stim": 3, "misc": 255})
+CHANNEL_TYPES_BY_CODE = MappingProxyType({code: name for name, code in CHANNEL_TYPE_CODES.items()})
+# 種別コード (uint8) から種別名への表。未定義のコードは misc として扱う
+CHANNEL_TYPE_LOOKUP = np.array(
+    [CHANNEL_TYPES_BY_CODE.get(code, "misc") for code in range(256)], dtype="U4"
+)
+CHANNEL_TYPE_LOOKUP.flags.writeable = False
+# ADC 値に lsb_to_volts を掛けて電圧へ変換するチャンネル種別
+VOLTAGE_CHANNEL_TYPES = ("eeg", "emg", "eog", "misc")
+CHANNEL_HEADER_DTYPE = np.dtype([("name", "S8"), ("type", "u1"), ("reserved", "u1")])
+
 
 class ChannelQualityMeta(TypedDict):
     status: str
@@ -44,11 +69,34 @@ class ChannelQualityAccumulator:
         self.analysis_indices = np.array(
             [ch_type in {"eeg", "emg", "eog"} for ch_type in ch_types], dtype=bool
         )
-        self.total_samples = np.zeros(self.num_channels, dtype=np.int64)
-        self.zero_samples = np.zeros(self.num_channels, dtype=np.int64)
-        self.high_impedance_samples = np.zeros(self.num_channels, dtype=np.int64)
-        self.unknown_impedance_samples = np.zeros(self.num_channels, dtype=np.int64)
-        self.flatline_detected = np.zeros(self.num_channels, dtype=bool)
+        analysis_positions = np.flatnonzero(self.analysis_indices)
+        self.num_analysis_channels = int(analysis_positions.size)
+        # 解析対象チャンネルが連続していればスライスで参照し、ファンシーインデックスのコピーを避ける
+        if (
+            self.num_analysis_channels
+            and analysis_positions[-1] - analysis_positions[0] + 1 == self.num_analysis_channels
+        ):
+            self._analysis_rows: slice | np.ndarray = slice(
+                int(analysis_positions[0]), int(analysis_positions[-1]) + 1
+            )
+        else:
+            self._analysis_rows = analysis_positions
+
+        # 総サンプル数は全チャンネル共通。以下のカウンタは解析対象チャンネル分だけを密に持ち、
+        # finalize で全チャンネルの並びへ展開する
+        self.total_samples = 0
+        self.zero_samples = np.zeros(self.num_analysis_channels, dtype=np.int64)
+        self.high_impedance_samples = np.zeros(self.num_analysis_channels, dtype=np.int64)
+        self.unknown_impedance_samples = np.zeros(self.num_analysis_channels, dtype=np.int64)
+        self.flatline_detected = np.zeros(self.num_analysis_channels, dtype=bool)
+        self._mask_scratch = np.empty(0, dtype=bool)
+
+    def _mask_buffer(self, shape: tuple[int, ...]) -> np.ndarray:
+        """Return a reusable boolean buffer of the given shape, growing it only when needed."""
+        size = int(np.prod(shape))
+        if self._mask_scratch.size < size:
+            self._mask_scratch = np.empty(size, dtype=bool)
+        return self._mask_scratch[:size].reshape(shape)
 
     def update(self, signals: np.ndarray, impedances: np.ndarray) -> None:
         """
@@ -63,70 +111,95 @@ class ChannelQualityAccumulator:
         num_samples = signals.shape[1]
         self.total_samples += num_samples
 
-        if not np.any(self.analysis_indices):
+        if not self.num_analysis_channels:
             return
 
-        analysis_signals = signals[self.analysis_indices]
-        analysis_impedances = impedances[self.analysis_indices]
+        analysis_signals = signals[self._analysis_rows]
+        analysis_impedances = impedances[self._analysis_rows]
 
-        self.zero_samples[self.analysis_indices] += np.count_nonzero(analysis_signals == 0, axis=1)
+        # ゼロとの比較でブール配列を作らず、非ゼロ件数から逆算する
+        self.zero_samples += num_samples - np.count_nonzero(analysis_signals, axis=1)
 
-        unknown_mask = analysis_impedances == 255
-        self.unknown_impedance_samples[self.analysis_indices] += np.count_nonzero(
-            unknown_mask, axis=1
-        )
+        # 比較結果はチャンクごとに確保せず、使い回すマスク用バッファへ書き込む
+        mask = self._mask_buffer(analysis_impedances.shape)
+        np.equal(analysis_impedances, 255, out=mask)
+        unknown_counts = np.count_nonzero(mask, axis=1)
+        self.unknown_impedance_samples += unknown_counts
 
-        high_mask = (analysis_impedances >= settings.channel_bad_impedance_threshold) & (
-            ~unknown_mask
-        )
-        self.high_impedance_samples[self.analysis_indices] += np.count_nonzero(high_mask, axis=1)
+        # 不明値 (255) は閾値以上の件数に必ず含まれるため、マスクを組み合わせずに差し引く
+        if settings.channel_bad_impedance_threshold <= 255:
+            np.greater_equal(
+                analysis_impedances, settings.channel_bad_impedance_threshold, out=mask
+            )
+            high_counts = np.count_nonzero(mask, axis=1)
+            self.high_impedance_samples += high_counts - unknown_counts
 
         ptp_values = np.ptp(analysis_signals, axis=1)
-        self.flatline_detected[self.analysis_indices] |= (
-            ptp_values <= settings.channel_flatline_ptp_threshold
-        )
+        self.flatline_detected |= ptp_values <= settings.channel_flatline_ptp_threshold
+
+    def _expand(self, values: np.ndarray) -> np.ndarray:
+        """Scatter per-analysis-channel values into an array covering every channel."""
+        expanded = np.zeros(self.num_channels, dtype=values.dtype)
+        expanded[self.analysis_indices] = values
+        return expanded
 
     def finalize(self) -> tuple[dict[str, ChannelQualityMeta], list[str]]:
         """
         Build a per-channel quality report and the list of bad channels.
         """
+        # 比率と判定はチャンネル全体に対して配列演算でまとめて求める
+        # (解析対象外のチャンネルはカウントが常に 0 のため比率も 0 になる)
+        total = max(self.total_samples, 1)
+        zero_ratios = self._expand(self.zero_samples) / total
+        high_ratios = self._expand(self.high_impedance_samples) / total
+        unknown_ratios = self._expand(self.unknown_impedance_samples) / total
+
+        zero_filled = self.analysis_indices & (zero_ratios >= settings.channel_zero_ratio_threshold)
+        high_impedance = self.analysis_indices & (
+            high_ratios >= settings.channel_bad_impedance_ratio
+        )
+        unknown_impedance = (
+            self.analysis_indices
+            & ~high_impedance
+            & (unknown_ratios >= settings.channel_unknown_impedance_ratio)
+        )
+        flatline = self._expand(self.flatline_detected)
+        is_bad = zero_filled | high_impedance
+        has_reason = is_bad | unknown_impedance | flatline
+
         report: dict[str, ChannelQualityMeta] = {}
-        bad_channels: list[str] = []
-
-        for idx, name in enumerate(self.ch_names):
-            ch_type = self.ch_types[idx]
-            total = max(int(self.total_samples[idx]), 1)
-            zero_ratio = float(self.zero_samples[idx]) / total
-            high_ratio = float(self.high_impedance_samples[idx]) / total
-            unknown_ratio = float(self.unknown_impedance_samples[idx]) / total
-            is_analysis_channel = bool(self.analysis_indices[idx])
+        bad_channels = [self.ch_names[idx] for idx in np.flatnonzero(is_bad).tolist()]
+
+        for idx, (name, ch_type, zero_ratio, high_ratio, unknown_ratio) in enumerate(
+            zip(
+                self.ch_names,
+                self.ch_types,
+                zero_ratios.tolist(),
+                high_ratios.tolist(),
+                unknown_ratios.tolist(),
+                strict=True,
+            )
+        ):
+            status = "bad" if is_bad[idx] else "good"
             reasons: list[str] = []
-            status = "good"
-
-            if is_analysis_channel:
-                if zero_ratio >= settings.channel_zero_ratio_threshold:
-                    status = "bad"
+            # 問題のないチャンネルでは理由の文字列を組み立てない
+            if has_reason[idx]:
+                if zero_filled[idx]:
                     reasons.append(f"zero-fill {zero_ratio:.0%}")
-
-                if high_ratio >= settings.channel_bad_impedance_ratio:
-                    status = "bad"
+                if high_impedance[idx]:
                     reasons.append(f"impedance high {high_ratio:.0%}")
-                elif unknown_ratio >= settings.channel_unknown_impedance_ratio:
+                elif unknown_impedance[idx]:
                     reasons.append(f"impedance unknown {unknown_ratio:.0%}")
-
-                if self.flatline_detected[idx]:
+                if flatline[idx]:
                     reasons.append("flatline amplitude")
 
-            if status == "bad":
-                bad_channels.append(name)
-
             report[name] = {
                 "status": status,
                 "reasons": reasons,
-                "zero_ratio": zero_ratio if is_analysis_channel else 0.0,
-                "bad_impedance_ratio": high_ratio if is_analysis_channel else 0.0,
-                "unknown_impedance_ratio": unknown_ratio if is_analysis_channel else 0.0,
-                "flatline": bool(self.flatline_detected[idx]) if is_analysis_channel else False,
+                "zero_ratio": zero_ratio,
+                "bad_impedance_ratio": high_ratio,
+                "unknown_impedance_ratio": unknown_ratio,
+                "flatline": bool(flatline[idx]),
                 "type": ch_type,
                 "has_warning": status != "bad" and bool(reasons),
             }
@@ -158,91 +231,133 @@ def _managed_object_storage_object(bucket: str, object_id: str):
                 )
 
 
-def parse_payload(data: bytes) -> dict | None:
+def _fetch_raw_object_payload(object_id: str) -> bytes | bytearray:
+    """Download a single raw data object. Runs on worker threads during export."""
+    with _managed_object_storage_object(RAW_DATA_BUCKET, object_id) as response:
+        content_length = response.headers.get("Content-Length")
+        if content_length is None:
+            return response.read()
+
+        # サイズが分かる場合は確保済みバッファへ直接読み込み、中間の bytes を作らない
+        payload = bytearray(int(content_length))
+        view = memoryview(payload)
+        filled = 0
+        while filled < len(payload):
+            read_size = response.readinto(view[filled:])
+            if not read_size:
+                break
+            filled += read_size
+        view.release()
+
+        if filled != len(payload):
+            raise OSError(
+                f"Incomplete read for object {object_id}: "
+                f"expected {len(payload)} bytes, got {filled}."
+            )
+        return payload
+
+
+@dataclass(frozen=True)
+class PayloadHeader:
+    """Channel layout decoded from a payload header, reusable for objects with identical bytes."""
+
+    raw: bytes
+    ch_names: list[str]
+    ch_types: list[str]
+    sample_dtype: np.dtype
+
+    @property
+    def size(self) -> int:
+        return len(self.raw)
+
+    @property
+    def num_channels(self) -> int:
+        return len(self.ch_names)
+
+
+def parse_header(data: bytes | bytearray | memoryview) -> PayloadHeader | None:
     """
-    最新のデータフォーマットのバイナリペイロードを解析し、チャンネル情報と全チャンネルのデータを抽出する。
-    sampling_rate と lsb_to_volts はDBから取得するため、ここでは解析しない。
+    ペイロード先頭のヘッダー (バージョン・チャンネル名・チャンネル種別) を解析する。
     """
-    try:
-        if len(data) < 4:  # version(1) + num_channels(1) + reserved(2)
-            return None
-
-        offset = 0
-        version, num_channels = struct.unpack_from("<BB", data, offset)
-        offset += 2
-
-        if version != 0x04:
-            print(f"Warning: Unsupported payload version: {version}. Expected 4.")
-            return None
-
-        offset += 2  # reserved
-
-        header_size = offset + (num_channels * 10)
-        if len(data) < header_size:
-            return None
-
-        ch_names = []
-        ch_types = []
-        type_map = {"eeg": 0, "emg": 1, "eog": 2, "stim": 3, "misc": 255}
-        int_to_type_map = {v: k for k, v in type_map.items()}
-
-        for _ in range(num_channels):
-            name_bytes = data[offset : offset + 8]
-            offset += 8
-            ch_type_int = data[offset]
-            offset += 1
-            offset += 1  # reserved
-            ch_names.append(name_bytes.split(b"\x00", 1)[0].decode("utf-8"))
-            ch_types.append(int_to_type_map.get(ch_type_int, "misc"))
-
-        # 1サンプルあたりのサイズ: signals(ch*2) + accel(6) + gyro(6) + impedance(ch*1)
-        sample_size = (num_channels * 2) + 6 + 6 + num_channels
-
-        samples_buffer = data[header_size:]
-        num_samples = len(samples_buffer) // sample_size
-
-        if num_samples == 0:
-            empty = np.empty((num_channels, 0), dtype=np.int16)
-            return {
-                "ch_names": ch_names,
-                "ch_types": ch_types,
-                "signals": empty,
-                "impedance": np.empty((num_channels, 0), dtype=np.uint8),
-            }
+    if len(data) < 4:  # version(1) + num_channels(1) + reserved(2)
+        return None
 
-        all_samples_flat = np.frombuffer(
-            samples_buffer,
-            dtype=np.uint8,
-            count=num_samples * sample_size,
-        )
-        samples_matrix = np.lib.stride_tricks.as_strided(
-            all_samples_flat,
-            shape=(num_samples, sample_size),
-            strides=(sample_size, 1),
-        ).copy()
-
-        signal_section = samples_matrix[:, : num_channels * 2]
-        impedance_section = samples_matrix[
-            :,
-            (num_channels * 2) + 12 : (num_channels * 2) + 12 + num_channels,
+    offset = 0
+    version, num_channels = struct.unpack_from("<BB", data, offset)
+    offset += 2
+
+    if version != 0x04:
+        print(f"Warning: Unsupported payload version: {version}. Expected 4.")
+        return None
+
+    offset += 2  # reserved
+
+    header_size = offset + (num_channels * 10)
+    if len(data) < header_size:
+        return None
+
+    # チャンネル定義 name(8) + type(1) + reserved(1) をまとめてレコード配列として読む
+    channels = np.frombuffer(data, dtype=CHANNEL_HEADER_DTYPE, count=num_channels, offset=offset)
+    ch_names = [name.split(b"\x00", 1)[0].decode("utf-8") for name in channels["name"].tolist()]
+    ch_types = CHANNEL_TYPE_LOOKUP[channels["type"]].tolist()
+
+    # 1サンプル分のレコード: signals(ch*2) + accel(6) + gyro(6) + impedance(ch*1)
+    sample_dtype = np.dtype(
+        [
+            ("signals", "<i2", (num_channels,)),
+            ("imu", "V12"),
+            ("impedance", "u1", (num_channels,)),
         ]
+    )
+    return PayloadHeader(
+        raw=bytes(data[:header_size]),
+        ch_names=ch_names,
+        ch_types=ch_types,
+        sample_dtype=sample_dtype,
+    )
 
-        signal_bytes = signal_section.reshape(-1).tobytes()
-        signals = (
-            np.frombuffer(
-                signal_bytes,
-                dtype="<i2",
-                count=num_samples * num_channels,
-            )
-            .reshape(num_samples, num_channels)
-            .T
+
+def parse_samples(
+    data: bytes | bytearray | memoryview, header: PayloadHeader
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ヘッダー以降のサンプル部を (num_channels, num_samples) の信号・インピーダンス配列として返す。
+    どちらも data を参照するビューで、コピーは行わない。
+    """
+    num_samples = (len(data) - header.size) // header.sample_dtype.itemsize
+    if num_samples <= 0:
+        return (
+            np.empty((header.num_channels, 0), dtype=np.int16),
+            np.empty((header.num_channels, 0), dtype=np.uint8),
         )
 
-        impedance = impedance_section.reshape(num_samples, num_channels).astype(np.uint8).T
+    # ヘッダー直後からレコード配列として読み、各フィールドをコピーせずに取り出す
+    records = np.frombuffer(data, dtype=header.sample_dtype, count=num_samples, offset=header.size)
+    return records["signals"].T, records["impedance"].T
+
 
+def parse_payload(
+    data: bytes | bytearray | memoryview, cached_header: PayloadHeader | None = None
+) -> dict | None:
+    """
+    最新のデータフォーマットのバイナリペイロードを解析し、チャンネル情報と全チャンネルのデータを抽出する。
+    sampling_rate と lsb_to_volts はDBから取得するため、ここでは解析しない。
+    data はバッファプロトコル対応オブジェクトであればよく、サンプル部はコピーせずに参照する。
+    cached_header とヘッダーのバイト列が一致する場合は、ヘッダーの解析を省略して再利用する。
+    """
+    try:
+        if cached_header is not None and data[: cached_header.size] == cached_header.raw:
+            header = cached_header
+        else:
+            header = parse_header(data)
+            if header is None:
+                return None
+
+        signals, impedance = parse_samples(data, header)
         return {
-            "ch_names": ch_names,
-            "ch_types": ch_types,
+            "header": header,
+            "ch_names": header.ch_names,
+            "ch_types": header.ch_types,
             "signals": signals,
             "impedance": impedance,
         }
@@ -252,12 +367,151 @@ def parse_payload(data: bytes) -> dict | None:
         return None
 
 
+def _write_tsv(path: str | Path, columns: list[str], rows: Iterable[Sequence]) -> None:
+    """Write a BIDS TSV file row by row without building a DataFrame."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def _channel_status_description(meta: ChannelQualityMeta | None) -> str:
+    """Summarize a channel's quality findings for the status_description column."""
+    if not meta:
+        return "n/a"
+    if meta["reasons"]:
+        return "; ".join(meta["reasons"])
+    if meta["has_warning"]:
+        return "warning"
+    return "n/a"
+
+
+def _write_json(path: str | Path, obj: object) -> None:
+    """Write obj as indented JSON, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2)
+
+
+def _update_channel_status(
+    channels_path: str | Path,
+    channel_report: dict[str, ChannelQualityMeta],
+    valid_channel_names: set[str],
+) -> None:
+    """
+    mne-bids が出力した channels.tsv の status / status_description 列を品質レポートで上書きする。
+    その他の列は書式を変えずにそのまま残す。
+    """
+    with open(channels_path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter="\t")
+        columns = [col.strip() for col in next(reader)]
+        rows = [row for row in reader if row]
+
+    name_index = columns.index("name") if "name" in columns else 0
+    for column in ("status", "status_description"):
+        if column not in columns:
+            columns.append(column)
+            for row in rows:
+                row.append("n/a")
+    status_index = columns.index("status")
+    description_index = columns.index("status_description")
+
+    updated_rows = []
+    for row in rows:
+        channel_name = row[name_index]
+        if channel_name not in valid_channel_names:
+            continue
+        meta = channel_report.get(channel_name)
+        row = [value or "n/a" for value in row]
+        row[status_index] = meta["status"] if meta else "good"
+        row[description_index] = _channel_status_description(meta)
+        updated_rows.append(row)
+
+    _write_tsv(channels_path, columns, updated_rows)
+
+
+def _iter_archive_members(root: Path) -> Iterator[Path]:
+    """Yield directories and files under root in the same order as shutil.make_archive."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        current = Path(dirpath)
+        yield current
+        for filename in sorted(filenames):
+            yield current / filename
+
+
+def _upload_dataset_archive(output_dir: Path, object_name: str) -> None:
+    """
+    bids_dataset ディレクトリをZIP化し、ローカルにアーカイブを作らずにオブジェクトストレージへ送る。
+    ZIPの書き込みは別スレッドで行い、パイプ経由でマルチパートアップロードへ流し込む。
+    """
+    read_fd, write_fd = os.pipe()
+    writer_errors: list[BaseException] = []
+
+    def _write_archive() -> None:
+        try:
+            with os.fdopen(write_fd, "wb") as sink:
+                with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+                    for path in _iter_archive_members(output_dir / "bids_dataset"):
+                        # 圧縮が効くテキストのメタデータだけを deflate し、信号データや
+                        # 刺激メディアは無圧縮で格納して CPU を使わない
+                        compress_type = (
+                            zipfile.ZIP_DEFLATED
+                            if path.suffix.lower() in ARCHIVE_DEFLATED_SUFFIXES
+                            else zipfile.ZIP_STORED
+                        )
+                        archive.write(
+                            path,
+                            arcname=path.relative_to(output_dir),
+                            compress_type=compress_type,
+                        )
+        except BaseException as exc:  # noqa: BLE001 - re-raised on the calling thread
+            writer_errors.append(exc)
+
+    writer = threading.Thread(target=_write_archive, name=f"zip-writer-{object_name}")
+    writer.start()
+    try:
+        with os.fdopen(read_fd, "rb") as source:
+            object_storage_client.put_object(
+                BIDS_BUCKET,
+                object_name,
+                source,
+                length=-1,
+                part_size=ARCHIVE_UPLOAD_PART_SIZE,
+                content_type="application/zip",
+            )
+    finally:
+        # 読み込み側を閉じてから待つため、アップロード失敗時も書き込みスレッドは終了する
+        writer.join()
+
+    if writer_errors:
+        # 途中で失敗したアーカイブでも中央ディレクトリは書かれるため、アップロード済みの物は消す
+        object_storage_client.remove_object(BIDS_BUCKET, object_name)
+        raise RuntimeError(
+            f"Failed to build BIDS archive {object_name}: {writer_errors[0]}"
+        ) from writer_errors[0]
+
+
+def _group_rows_by_session(rows: Iterable[Any]) -> dict[str, list[Any]]:
+    """session_id でソート済みの行をセッションごとのリストに振り分ける。"""
+    return {
+        session_id: list(group) for session_id, group in groupby(rows, key=itemgetter("session_id"))
+    }
+
+
 def create_bids_dataset(
     experiment_id: UUID, task_id: UUID, output_dir: str | Path, zip_output: bool = True
 ) -> str:
     """
     BIDSエクスポートプロセスを調整するメイン関数。チャンネルタイプを動的に処理する。
     """
+    # mne / mne_bids は読み込みが重いため、API プロセスではなくエクスポートのワーカーで読み込む
+    import mne
+    from mne_bids import BIDSPath, write_raw_bids
+
     bids_root = Path(output_dir) / "bids_dataset"
     if bids_root.exists():
         shutil.rmtree(bids_root)
@@ -303,17 +557,15 @@ def create_bids_dataset(
                     "DatasetType": "raw",
                     "Authors": ["EEG Platform User"],
                 }
-                with open(bids_root / "dataset_description.json", "w") as f:
-                    json.dump(dataset_description, f, indent=2)
+                _write_json(bids_root / "dataset_description.json", dataset_description)
 
                 participant_ids = sorted(
                     {session["user_id"].replace("-", "") for session in sessions}
                 )
-                participants_df = pd.DataFrame({"participant_id": participant_ids})
-                participants_df.to_csv(
+                _write_tsv(
                     bids_root / "participants.tsv",
-                    sep="\t",
-                    index=False,
+                    ["participant_id"],
+                    ([participant_id] for participant_id in participant_ids),
                 )
 
                 # --- 3. 刺激（Stimuli）をダウンロード ---
@@ -331,24 +583,85 @@ def create_bids_dataset(
                 )
                 stimuli = cur.fetchall()
                 if stimuli:
-                    for stim in stimuli:
-                        stim_path = stimuli_dir / stim["file_name"]
-                        object_storage_client.fget_object(
-                            MEDIA_BUCKET,
-                            stim["object_id"],
-                            str(stim_path),
-                        )
-
-                    stimuli_df = pd.DataFrame(
-                        {"stim_file": [f"stimuli/{stim['file_name']}" for stim in stimuli]}
+                    # 刺激ファイルは互いに独立なので並列にダウンロードする
+                    stimulus_workers = min(
+                        settings.stimulus_fetch_workers,
+                        settings.object_storage_max_connections,
+                        len(stimuli),
                     )
-                    stimuli_df.to_csv(
+                    with ThreadPoolExecutor(max_workers=stimulus_workers) as executor:
+                        downloads = [
+                            executor.submit(
+                                object_storage_client.fget_object,
+                                MEDIA_BUCKET,
+                                stim["object_id"],
+                                str(stimuli_dir / stim["file_name"]),
+                            )
+                            for stim in stimuli
+                        ]
+                        # 最初の失敗で未着手のダウンロードを取り消し、その例外を送出する
+                        done, not_done = wait(downloads, return_when=FIRST_EXCEPTION)
+                        for download in not_done:
+                            download.cancel()
+                        for download in done:
+                            download.result()
+
+                    _write_tsv(
                         bids_root / "stimuli.tsv",
-                        sep="\t",
-                        index=False,
+                        ["stim_file"],
+                        ([f"stimuli/{stim['file_name']}"] for stim in stimuli),
                     )
 
-                # --- 4. 各セッションを処理 ---
+                # --- 4. 全セッションの生データオブジェクトとイベントをまとめて取得 ---
+                # セッションごとに問い合わせると往復が 2N 回になるため、1 回ずつで取得して振り分ける
+                session_ids = [session["session_id"] for session in sessions]
+                cur.execute(
+                    """
+                    SELECT
+                        sol.session_id,
+                        rdo.object_id,
+                        rdo.timestamp_start_ms,
+                        rdo.sampling_rate,
+                        rdo.lsb_to_volts
+                    FROM raw_data_objects rdo
+                    JOIN session_object_links sol ON rdo.object_id = sol.object_id
+                    WHERE sol.session_id = ANY(%s)
+                    ORDER BY sol.session_id, rdo.timestamp_start_ms ASC
+                    """,
+                    (session_ids,),
+                )
+                objects_by_session = _group_rows_by_session(cur.fetchall())
+
+                # オンセットはセッション最初の生データオブジェクトの開始時刻からの秒数として
+                # DB側で計算する (生データのないセッションは処理対象外のため除外される)
+                cur.execute(
+                    """
+                    WITH session_starts AS (
+                        SELECT sol.session_id, MIN(rdo.timestamp_start_ms) AS start_ms
+                        FROM raw_data_objects rdo
+                        JOIN session_object_links sol ON rdo.object_id = sol.object_id
+                        WHERE sol.session_id = ANY(%s)
+                        GROUP BY sol.session_id
+                    )
+                    SELECT
+                        se.session_id,
+                        (se.onset_corrected_us - ss.start_ms * 1000)::double precision
+                            / 1000000.0 AS onset_seconds,
+                        se.duration,
+                        se.trial_type,
+                        COALESCE(es.file_name, ci.file_name) AS file_name
+                    FROM session_events se
+                    JOIN session_starts ss ON se.session_id = ss.session_id
+                    LEFT JOIN experiment_stimuli es ON se.stimulus_id = es.stimulus_id
+                    LEFT JOIN calibration_items ci ON se.calibration_item_id = ci.item_id
+                    WHERE se.onset_corrected_us IS NOT NULL
+                    ORDER BY se.session_id, se.onset_corrected_us ASC
+                    """,
+                    (session_ids,),
+                )
+                events_by_session = _group_rows_by_session(cur.fetchall())
+
+                # --- 5. 各セッションを処理 ---
                 for i, session in enumerate(sessions):
                     progress = 20 + int(70 * (i / len(sessions)))
                     update_task_status(
@@ -372,21 +685,7 @@ def create_bids_dataset(
                         datatype="eeg",
                     )
 
-                    cur.execute(
-                        """
-                        SELECT
-                            rdo.object_id,
-                            rdo.timestamp_start_ms,
-                            rdo.sampling_rate,
-                            rdo.lsb_to_volts
-                        FROM raw_data_objects rdo
-                        JOIN session_object_links sol ON rdo.object_id = sol.object_id
-                        WHERE sol.session_id = %s
-                        ORDER BY rdo.timestamp_start_ms ASC
-                        """,
-                        (session["session_id"],),
-                    )
-                    data_objects = cur.fetchall()
+                    data_objects = objects_by_session.get(session["session_id"], [])
                     if not data_objects:
                         print(
                             "Warning: No raw data found for session {session_id}. "
@@ -394,26 +693,30 @@ def create_bids_dataset(
                         )
                         continue
 
-                    session_t0_ms = data_objects[0]["timestamp_start_ms"]
-
                     all_session_data: list[np.ndarray] = []
                     session_ch_names = None
                     session_ch_types = None
                     session_sampling_rate = None
                     session_lsb_to_volts = None
                     quality_accumulator: ChannelQualityAccumulator | None = None
-
-                    for obj in data_objects:
-                        with _managed_object_storage_object(
-                            RAW_DATA_BUCKET, obj["object_id"]
-                        ) as response:
-                            payload = response.read()
-
+                    session_header: PayloadHeader | None = None
+
+                    object_ids = [obj["object_id"] for obj in data_objects]
+                    # HTTP 接続プールを超える並列度は待ちを生むだけなので上限を揃える
+                    fetch_workers = min(
+                        settings.raw_object_fetch_workers,
+                        settings.object_storage_max_connections,
+                        len(object_ids),
+                    )
+                    with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+                        # 取得は並列に行い、解析と品質集計は順序を保ってメインスレッドで行う
+                        payloads = executor.map(_fetch_raw_object_payload, object_ids)
+                        for obj, payload in zip(data_objects, payloads, strict=True):
                             if not payload:
                                 print(f"Warning: Object {obj['object_id']} is empty. Skipping.")
                                 continue
 
-                            parsed = parse_payload(payload)
+                            parsed = parse_payload(payload, session_header)
 
                             if not parsed:
                                 print(
@@ -423,6 +726,7 @@ def create_bids_dataset(
                                 continue
 
                             if session_sampling_rate is None:
+                                session_header = parsed["header"]
                                 session_sampling_rate = obj["sampling_rate"]
                                 session_lsb_to_volts = obj["lsb_to_volts"]
                                 session_ch_names = parsed["ch_names"]
@@ -473,15 +777,30 @@ def create_bids_dataset(
                     if quality_accumulator is not None:
                         channel_report, bad_channels = quality_accumulator.finalize()
 
-                    full_data_adc = np.concatenate(all_session_data, axis=1)
-
-                    scaling_factors = np.array(
-                        [
-                            session_lsb_to_volts if ctype in ["eeg", "emg", "eog", "misc"] else 1.0
-                            for ctype in session_ch_types
-                        ]
-                    ).reshape(-1, 1)
-                    full_data_scaled = full_data_adc.astype(np.float64) * scaling_factors
+                    scaling_factors = np.where(
+                        np.isin(session_ch_types, VOLTAGE_CHANNEL_TYPES),
+                        float(session_lsb_to_volts),
+                        1.0,
+                    )[:, np.newaxis]
+
+                    # RawArray は float64 で保持するため、最終配列を確保して各チャンクを
+                    # スケーリングしながら直接書き込む (int16 の結合配列は作らない)
+                    total_samples = sum(chunk.shape[1] for chunk in all_session_data)
+                    full_data_scaled = np.empty(
+                        (len(session_ch_names), total_samples), dtype=np.float64
+                    )
+                    write_offset = 0
+                    # 書き込み済みのチャンクはリストから外し、元のダウンロードバッファを順次解放する
+                    all_session_data.reverse()
+                    while all_session_data:
+                        chunk = all_session_data.pop()
+                        chunk_samples = chunk.shape[1]
+                        np.multiply(
+                            chunk,
+                            scaling_factors,
+                            out=full_data_scaled[:, write_offset : write_offset + chunk_samples],
+                        )
+                        write_offset += chunk_samples
 
                     mne_info = mne.create_info(
                         ch_names=session_ch_names,
@@ -491,25 +810,11 @@ def create_bids_dataset(
                     mne_info.set_montage("standard_1020", on_missing="warn")
                     raw = mne.io.RawArray(full_data_scaled, mne_info, verbose=False)
                     raw.info["bads"] = bad_channels
+                    # write_raw_bids がサイドカーの PowerLineFrequency を直接出力する
+                    # (EEGReference は既定で "n/a")
+                    raw.info["line_freq"] = 50
 
-                    cur.execute(
-                        """
-                        SELECT
-                            se.onset,
-                            se.duration,
-                            se.trial_type,
-                            se.onset_corrected_us,
-                            COALESCE(es.file_name, ci.file_name) AS file_name
-                        FROM session_events se
-                        LEFT JOIN experiment_stimuli es ON se.stimulus_id = es.stimulus_id
-                        LEFT JOIN calibration_items ci ON se.calibration_item_id = ci.item_id
-                        WHERE se.session_id = %s
-                          AND se.onset_corrected_us IS NOT NULL
-                        ORDER BY se.onset_corrected_us ASC
-                        """,
-                        (session["session_id"],),
-                    )
-                    events = cur.fetchall()
+                    events = events_by_session.get(session["session_id"], [])
 
                     write_raw_bids(
                         raw,
@@ -517,110 +822,44 @@ def create_bids_dataset(
                         overwrite=True,
                         verbose=False,
                         allow_preload=True,
-                        format="EDF",
+                        format="BrainVision",
                     )
 
                     if events:
-                        session_t0_us = session_t0_ms * 1000
-                        events_data = {
-                            "onset": [
-                                (e["onset_corrected_us"] - session_t0_us) / 1_000_000.0
-                                for e in events
-                            ],
-                            "duration": [e["duration"] for e in events],
-                            "trial_type": [e["trial_type"] for e in events],
-                            "stim_file": [
-                                f"stimuli/{e['file_name']}" if e["file_name"] else "n/a"
+                        _write_tsv(
+                            bids_path.copy().update(suffix="events", extension=".tsv").fpath,
+                            ["onset", "duration", "trial_type", "stim_file"],
+                            (
+                                (
+                                    e["onset_seconds"],
+                                    e["duration"],
+                                    e["trial_type"],
+                                    f"stimuli/{e['file_name']}" if e["file_name"] else "n/a",
+                                )
                                 for e in events
-                            ],
-                        }
-                        events_df = pd.DataFrame(events_data)
-                        events_df.to_csv(
-                            bids_path.copy().update(suffix="events", extension=".tsv"),
-                            sep="\t",
-                            index=False,
+                            ),
                         )
 
-                    sidecar_path = bids_path.copy().update(suffix="eeg", extension=".json").fpath
-                    with open(sidecar_path, encoding="utf-8") as f:
-                        sidecar_data = json.load(f)
-
-                    sidecar_data["PowerLineFrequency"] = 50
-                    sidecar_data["EEGReference"] = "n/a"
-
-                    with open(sidecar_path, "w", encoding="utf-8") as f:
-                        json.dump(sidecar_data, f, indent=4)
-
                     channels_path = (
                         bids_path.copy().update(suffix="channels", extension=".tsv").fpath
                     )
-                    channels_df = pd.read_csv(channels_path, sep="\t")
-                    channels_df.columns = [col.strip() for col in channels_df.columns]
-                    channel_name_column = "name"
-                    if channel_name_column not in channels_df.columns:
-                        channel_name_column = channels_df.columns[0]
-
-                    valid_channel_names = set(raw.ch_names)
-                    channels_df = channels_df[
-                        channels_df[channel_name_column].isin(valid_channel_names)
-                    ].copy()
-
-                    def _map_status(channel_name: str, _report=channel_report) -> str:
-                        meta = _report.get(channel_name)
-                        if not meta:
-                            return "good"
-                        return meta["status"]
-
-                    def _map_description(channel_name: str, _report=channel_report) -> str:
-                        meta = _report.get(channel_name)
-                        if not meta:
-                            return "n/a"
-                        reasons = meta["reasons"]
-                        if reasons:
-                            return "; ".join(reasons)
-                        if meta["has_warning"]:
-                            return "warning"
-                        return "n/a"
-
-                    if "status" not in channels_df.columns:
-                        channels_df["status"] = "good"
-                    if "status_description" not in channels_df.columns:
-                        channels_df["status_description"] = "n/a"
-
-                    channels_df["status"] = channels_df[channel_name_column].map(_map_status)
-                    channels_df["status_description"] = channels_df[channel_name_column].map(
-                        _map_description
-                    )
-                    channels_df.to_csv(channels_path, sep="\t", index=False, na_rep="n/a")
+                    _update_channel_status(channels_path, channel_report, set(raw.ch_names))
 
                     quality_path = (
                         bids_path.copy()
                         .update(description="quality", suffix="channels", extension=".json")
                         .fpath
                     )
-                    with open(quality_path, "w", encoding="utf-8") as f:
-                        json.dump(channel_report, f, indent=2)
+                    _write_json(quality_path, channel_report)
 
         if zip_output:
             update_task_status(task_id, progress=90, status_message="Compressing dataset")
-            zip_base_name = Path(output_dir) / f"eid_{experiment_id}"
-            zip_path = shutil.make_archive(
-                base_name=str(zip_base_name),
-                format="zip",
-                root_dir=output_dir,
-                base_dir="bids_dataset",
-            )
-
-            object_name = os.path.basename(zip_path)
-            object_storage_client.fput_object(
-                bucket_name=BIDS_BUCKET,
-                object_name=object_name,
-                file_path=zip_path,
-            )
+            object_name = f"eid_{experiment_id}.zip"
+            _upload_dataset_archive(Path(output_dir), object_name)
             print(f"[Task: {task_id}] Uploaded BIDS archive to object storage: {object_name}")
 
             update_task_status(task_id, progress=100, status="completed", result_path=object_name)
-            return zip_path
+            return object_name
         else:
             update_task_status(
                 task_id, progress=100, status="completed", result_path=str(bids_root.resolve())
@@ -637,8 +876,3 @@ def create_bids_dataset(
     finally:
         if "bids_root" in locals() and bids_root.exists() and zip_output:
             shutil.rmtree(bids_root)
-        if zip_output and "zip_path" in locals():
-            try:
-                Path(zip_path).unlink(missing_ok=True)  # type: ignore[arg-type]
-            except Exception:
-                pass
@@ -1,6 +1,9 @@
+import threading
+import time
 from uuid import UUID
 
 from ..app.schemas import TaskStatus
+from ..config.env import settings
 from ..infrastructure.db import get_db_connection, get_db_cursor
 
 
@@ -28,6 +31,87 @@ def get_task_status(task_id: UUID) -> TaskStatus | None:
     return None
 
 
+FINAL_TASK_STATUSES = frozenset({"completed", "failed"})
+
+
+def _write_task_columns(task_id: UUID, columns: dict[str, object]) -> None:
+    """Write the given export_tasks columns for a single task."""
+    with get_db_connection() as conn:
+        with get_db_cursor(conn) as cur:
+            # Build the SET part of the query dynamically
+            set_clauses = ["updated_at = NOW()"]
+            params: list[object] = []
+            for column, value in columns.items():
+                set_clauses.append(f"{column} = %s")
+                params.append(value)
+
+            query = f"UPDATE export_tasks SET {', '.join(set_clauses)} WHERE task_id = %s"
+            params.append(str(task_id))
+
+            cur.execute(query, tuple(params))
+
+
+class TaskStatusWriter:
+    """
+    Coalesces export task updates and writes them from a background thread.
+
+    Progress updates only matter for their latest value, so updates queued for the same
+    task are merged and written at most once per flush interval. Final statuses are
+    written synchronously together with anything still queued for that task.
+    """
+
+    def __init__(self, flush_interval: float) -> None:
+        self.flush_interval = flush_interval
+        self._pending: dict[UUID, dict[str, object]] = {}
+        self._pending_lock = threading.Lock()
+        # Held while a batch is taken and written so that writes are never reordered
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, task_id: UUID, columns: dict[str, object]) -> None:
+        if columns.get("status") in FINAL_TASK_STATUSES:
+            with self._write_lock:
+                with self._pending_lock:
+                    merged = {**self._pending.pop(task_id, {}), **columns}
+                _write_task_columns(task_id, merged)
+            return
+
+        with self._pending_lock:
+            self._pending.setdefault(task_id, {}).update(columns)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="task-status-writer", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._write_lock:
+                with self._pending_lock:
+                    batch, self._pending = self._pending, {}
+                failed: dict[UUID, dict[str, object]] = {}
+                for task_id, columns in batch.items():
+                    try:
+                        _write_task_columns(task_id, columns)
+                    except Exception as e:
+                        print(f"Warning: Failed to update status for task {task_id}: {e}")
+                        failed[task_id] = columns
+                if failed:
+                    # Re-queue for the next flush; newer updates queued meanwhile take precedence
+                    with self._pending_lock:
+                        for task_id, columns in failed.items():
+                            self._pending[task_id] = {**columns, **self._pending.get(task_id, {})}
+                    self._wakeup.set()
+            time.sleep(self.flush_interval)
+
+
+_status_writer = TaskStatusWriter(settings.task_status_flush_interval_seconds)
+
+
 def update_task_status(
     task_id: UUID,
     progress: int | None = None,
@@ -39,36 +123,26 @@ def update_task_status(
     """
     Updates the status, progress, and other details of an export task.
     This function is designed to be called multiple times during the export process.
+    Intermediate updates are written asynchronously; "completed" and "failed" are written
+    before this function returns.
     """
-    with get_db_connection() as conn:
-        with get_db_cursor(conn) as cur:
-            # Build the SET part of the query dynamically
-            set_clauses = ["updated_at = NOW()"]
-            params = []
+    columns: dict[str, object] = {}
 
-            if status is not None:
-                set_clauses.append("status = %s")
-                params.append(status)
-            elif status_message is not None:
-                set_clauses.append("status = %s")
-                params.append("processing")
+    if status is not None:
+        columns["status"] = status
+    elif status_message is not None:
+        columns["status"] = "processing"
 
-            if progress is not None:
-                set_clauses.append("progress = %s")
-                params.append(progress)
+    if progress is not None:
+        columns["progress"] = progress
 
-            if result_path is not None:
-                set_clauses.append("result_file_path = %s")
-                params.append(result_path)
+    if result_path is not None:
+        columns["result_file_path"] = result_path
 
-            if error_message is not None:
-                set_clauses.append("error_message = %s")
-                params.append(error_message)
+    if error_message is not None:
+        columns["error_message"] = error_message
 
-            if not set_clauses:
-                return  # Nothing to update
+    if not columns:
+        return  # Nothing to update
 
-            query = f"UPDATE export_tasks SET {', '.join(set_clauses)} WHERE task_id = %s"
-            params.append(str(task_id))
-
-            cur.execute(query, tuple(params))
+    _status_writer.submit(task_id, columns)
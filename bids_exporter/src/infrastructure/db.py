@@ -1,14 +1,42 @@
+import threading
 from contextlib import contextmanager
 
-import psycopg2
-from psycopg2.extras import DictCursor
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 
 from ..config.env import settings
 
+_pool: ThreadedConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadedConnectionPool:
+    """Lazily create the process-wide connection pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    minconn=settings.db_pool_min_connections,
+                    maxconn=settings.db_pool_max_connections,
+                    dsn=settings.database_url,
+                )
+    return _pool
+
+
+def close_db_pool() -> None:
+    """Close every pooled connection; the next get_db_connection call opens a new pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
 
 @contextmanager
 def get_db_connection():
-    conn = psycopg2.connect(settings.database_url)
+    pool = _get_pool()
+    conn = pool.getconn()
     try:
         yield conn
         conn.commit()
@@ -16,12 +44,13 @@ def get_db_connection():
         conn.rollback()
         raise
     finally:
-        conn.close()
+        # 切断済みの接続はプールへ戻さずに破棄する
+        pool.putconn(conn, close=bool(conn.closed))
 
 
 @contextmanager
 def get_db_cursor(conn):
-    cur = conn.cursor(cursor_factory=DictCursor)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
     try:
         yield cur
     finally:
@@ -1,30 +1,107 @@
-import asyncio
+import os
+from collections import deque
+from collections.abc import Generator
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
 
+import certifi
+import urllib3
 from minio import Minio as S3CompatibleClient
 
 from ..config.env import settings
 
+# MinIO クライアント既定の設定に合わせつつ、並列取得に足りる接続数を確保する
+_http_client = urllib3.PoolManager(
+    timeout=urllib3.Timeout(connect=300, read=300),
+    maxsize=settings.object_storage_max_connections,
+    cert_reqs="CERT_REQUIRED",
+    ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+    retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+)
+
 object_storage_client = S3CompatibleClient(
     endpoint=f"{settings.object_storage_endpoint}:{settings.object_storage_port}",
     access_key=settings.object_storage_access_key,
     secret_key=settings.object_storage_secret_key,
     secure=settings.object_storage_use_ssl,
+    http_client=_http_client,
 )
 
+
+def _create_public_object_storage_client() -> S3CompatibleClient | None:
+    """Create a client that signs URLs for the externally reachable endpoint, if one is set."""
+    if not settings.object_storage_public_url:
+        return None
+    public_url = urlsplit(settings.object_storage_public_url)
+    # region を固定して、署名時にリージョン問い合わせの通信が発生しないようにする
+    return S3CompatibleClient(
+        endpoint=public_url.netloc,
+        access_key=settings.object_storage_access_key,
+        secret_key=settings.object_storage_secret_key,
+        secure=public_url.scheme == "https",
+        region=settings.object_storage_region,
+        http_client=_http_client,
+    )
+
+
+public_object_storage_client = _create_public_object_storage_client()
+
 RAW_DATA_BUCKET = settings.object_storage_raw_data_bucket
 MEDIA_BUCKET = settings.object_storage_media_bucket
 BIDS_BUCKET = settings.object_storage_bids_exports_bucket
 
 
-async def check_object_storage_connection() -> None:
+def close_object_storage_connections() -> None:
+    """Close the pooled HTTP connections held by the object storage client."""
+    _http_client.clear()
+
+
+def _get_object_range(bucket: str, object_name: str, offset: int, length: int) -> bytes:
+    """Read one byte range of an object and release its connection back to the pool."""
+    response = object_storage_client.get_object(bucket, object_name, offset=offset, length=length)
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def iter_object_ranges(
+    bucket: str,
+    object_name: str,
+    size: int,
+    part_size: int,
+    workers: int,
+) -> Generator[bytes, None, None]:
+    """
+    Yield an object's bytes in order while fetching up to `workers` byte ranges ahead in parallel.
+    At most `workers` parts are buffered at a time.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="object-range")
+    pending: deque[Future[bytes]] = deque()
+    try:
+        for offset in range(0, size, part_size):
+            pending.append(
+                executor.submit(
+                    _get_object_range, bucket, object_name, offset, min(part_size, size - offset)
+                )
+            )
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # クライアント切断時は先読み中のパートを破棄する
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def check_object_storage_connection() -> None:
     """Ensure the object storage connection succeeds and the BIDS bucket exists."""
     print("Checking object storage connection and bucket status...")
-    loop = asyncio.get_event_loop()
     try:
-        found = await loop.run_in_executor(None, object_storage_client.bucket_exists, BIDS_BUCKET)
-        if not found:
+        if not object_storage_client.bucket_exists(BIDS_BUCKET):
             print(f"Bucket '{BIDS_BUCKET}' not found. Creating it...")
-            await loop.run_in_executor(None, object_storage_client.make_bucket, BIDS_BUCKET)
+            object_storage_client.make_bucket(BIDS_BUCKET)
             print(f"Bucket '{BIDS_BUCKET}' created successfully.")
         else:
             print(f"Bucket '{BIDS_BUCKET}' already exists.")
@@ -1,17 +1,52 @@
 import logging
+import time
 from uuid import UUID
 
 import httpx
-from fastapi import Header, HTTPException
+import orjson
+from fastapi import Header, HTTPException, Request
 
 from ...config.env import settings
+from ...infrastructure.resilience import CircuitBreaker, CircuitOpenError, post_with_retry
+from .clients import get_auth_client
 
 # --- ロガー設定 ---
 logger = logging.getLogger(__name__)
 
 
+AUTH_CHECK_PATH = "/api/v1/auth/check"
+REQUIRED_ROLE = "owner"
+AUTH_CACHE_MAX_ENTRIES = 1024
+
+# (user_id, experiment_id, role) -> 認可結果の有効期限 (time.monotonic 基準)
+# 権限付与直後に拒否が残らないよう、キャッシュするのは認可された結果のみ
+_authorized_until: dict[tuple[str, str, str], float] = {}
+_auth_breaker = CircuitBreaker("auth_manager")
+
+
+def create_auth_client() -> httpx.AsyncClient:
+    """Create the client shared by all requests so connections to the Auth Manager are reused."""
+    return httpx.AsyncClient(
+        base_url=settings.auth_manager_url,
+        timeout=settings.auth_request_timeout_seconds,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    )
+
+
+def _remember_authorization(key: tuple[str, str, str]) -> None:
+    """Cache a granted authorization, pruning expired entries once the cache is full."""
+    now = time.monotonic()
+    if len(_authorized_until) >= AUTH_CACHE_MAX_ENTRIES:
+        for expired_key in [k for k, until in _authorized_until.items() if until <= now]:
+            del _authorized_until[expired_key]
+        if len(_authorized_until) >= AUTH_CACHE_MAX_ENTRIES:
+            _authorized_until.clear()
+    _authorized_until[key] = now + settings.auth_cache_ttl_seconds
+
+
 async def verify_owner_role(
     experiment_id: UUID,
+    request: Request,
     x_user_id: str | None = Header(None, alias="X-User-Id"),
 ) -> bool:
     """
@@ -25,25 +60,38 @@ async def verify_owner_role(
         )
         raise HTTPException(status_code=401, detail="Unauthorized: X-User-Id header is required.")
 
-    auth_check_url = f"{settings.auth_manager_url}/api/v1/auth/check"
-    payload = {"user_id": x_user_id, "experiment_id": str(experiment_id), "required_role": "owner"}
+    experiment_key = str(experiment_id)
+    cache_key = (x_user_id, experiment_key, REQUIRED_ROLE)
+    if _authorized_until.get(cache_key, float("-inf")) > time.monotonic():
+        return True
+
+    # 本文は orjson で直接バイト列にし、httpx 内部の JSON エンコードを経由させない
+    body = orjson.dumps(
+        {
+            "user_id": x_user_id,
+            "experiment_id": experiment_key,
+            "required_role": REQUIRED_ROLE,
+        }
+    )
 
     try:
-        async with httpx.AsyncClient() as client:
-            # ★★★ 修正箇所: タイムアウトを明示的に10秒に設定 ★★★
-            response = await client.post(auth_check_url, json=payload, timeout=10.0)
+        response = await post_with_retry(
+            get_auth_client(request), AUTH_CHECK_PATH, breaker=_auth_breaker, content=body
+        )
 
         if response.status_code == 200:
-            if response.json().get("authorized"):
+            if orjson.loads(response.content).get("authorized"):
                 logger.info(
                     "User '%s' is authorized as owner for experiment '%s'.",
                     x_user_id,
                     experiment_id,
                 )
+                if settings.auth_cache_ttl_seconds > 0:
+                    _remember_authorization(cache_key)
                 return True
 
         if response.status_code in [403, 404]:
-            error_detail = response.json().get("error", "Authorization failed.")
+            error_detail = orjson.loads(response.content).get("error", "Authorization failed.")
             logger.warning(
                 "Authorization failed for user '%s' on experiment '%s': %s",
                 x_user_id,
@@ -61,10 +109,17 @@ async def verify_owner_role(
             status_code=503, detail="Authorization service returned an unexpected error."
         )
 
+    except CircuitOpenError as exc:
+        logger.warning("Skipping authorization check: %s", exc)
+        raise HTTPException(
+            status_code=503,
+            detail="Service Unavailable: Authorization service is temporarily unavailable.",
+        ) from exc
     except httpx.RequestError as exc:
         logger.exception(
-            "Could not connect to the authorization service at %s.",
-            auth_check_url,
+            "Could not connect to the authorization service at %s%s.",
+            settings.auth_manager_url,
+            AUTH_CHECK_PATH,
         )
         raise HTTPException(
             status_code=503,
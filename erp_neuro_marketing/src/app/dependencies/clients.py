@@ -0,0 +1,22 @@
+import httpx
+from fastapi import Request
+
+
+def _get_state_client(request: Request, name: str) -> httpx.AsyncClient:
+    """Return a lifespan-managed client from app.state, failing clearly before startup."""
+    client = getattr(request.app.state, name, None)
+    if client is None:
+        raise RuntimeError(
+            f"app.state.{name} is not initialised; the application lifespan has not started."
+        )
+    return client
+
+
+def get_auth_client(request: Request) -> httpx.AsyncClient:
+    """lifespan で作成した Auth Manager 用の共有クライアントを返す。"""
+    return _get_state_client(request, "auth_client")
+
+
+def get_bids_client(request: Request) -> httpx.AsyncClient:
+    """lifespan で作成した BIDS Exporter 用の共有クライアントを返す。"""
+    return _get_state_client(request, "bids_client")
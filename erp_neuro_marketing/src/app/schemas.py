@@ -1,12 +1,15 @@
 from datetime import datetime
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 
 class ProductRecommendation(BaseModel):
     """A single recommended product's details."""
 
+    # 生成後に変更しないため凍結する (オーケストレーター由来の余分なキーは無視する)
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     file_name: str
     item_name: str | None = None
     brand_name: str | None = None
@@ -15,9 +18,15 @@ class ProductRecommendation(BaseModel):
     gender: str | None = None
 
 
+# 保存済みの推奨リストを1回の検証でまとめて復元するためのアダプター
+RECOMMENDATIONS_ADAPTER = TypeAdapter(list[ProductRecommendation])
+
+
 class AnalysisResponse(BaseModel):
     """The final response from the neuro-marketing analysis."""
 
+    model_config = ConfigDict(frozen=True)
+
     experiment_id: UUID = Field(..., description="The ID of the analyzed experiment.")
     recommendations: list[ProductRecommendation] = Field(
         ..., description="List of recommended products based on ERP analysis."
@@ -28,6 +37,8 @@ class AnalysisResponse(BaseModel):
 class AnalysisResultSnapshot(BaseModel):
     """Persisted analysis result that can be retrieved later."""
 
+    model_config = ConfigDict(frozen=True)
+
     analysis_id: int = Field(..., description="Unique identifier for the stored analysis result.")
     experiment_id: UUID
     summary: str
@@ -1,28 +1,65 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from uuid import UUID
 
-from fastapi import Depends, FastAPI, Header, HTTPException
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import ValidationError
 
 from ..config.env import settings
 from ..domain.analysis.orchestrator import run_full_analysis
-from ..infrastructure.db import get_latest_analysis_result, save_analysis_result
-from .dependencies.auth import verify_owner_role
-from .schemas import AnalysisResponse, AnalysisResultSnapshot, ProductRecommendation
+from ..infrastructure.bids_client import create_bids_client
+from ..infrastructure.db import close_db_pool, get_latest_analysis_result, save_analysis_result
+from .dependencies.auth import create_auth_client, verify_owner_role
+from .dependencies.clients import get_bids_client
+from .schemas import RECOMMENDATIONS_ADAPTER, AnalysisResponse, AnalysisResultSnapshot
 
 # --- ロギング設定 ---
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    起動時に共有ボリュームの確認と共有の HTTP クライアントの作成を行い、
+    終了時にクライアントとDB接続プールを閉じる。
+    """
+    logger.info("🚀 ERP Neuro-Marketing Service starting...")
+    shared_path = Path(settings.shared_volume_path)
+    if not shared_path.exists():
+        logger.warning(f"Shared volume path does not exist: {shared_path}")
+    else:
+        logger.info(f"Shared volume path is ready: {shared_path}")
+
+    # auth_manager / bids_exporter への接続をリクエスト間で再利用する
+    app.state.auth_client = create_auth_client()
+    app.state.bids_client = create_bids_client()
+    try:
+        yield
+    finally:
+        await app.state.auth_client.aclose()
+        await app.state.bids_client.aclose()
+        close_db_pool()
+
+
 # --- FastAPIアプリケーション ---
-app = FastAPI(title="ERP Neuro-Marketing Service")
+app = FastAPI(
+    title="ERP Neuro-Marketing Service",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# ヘルスチェックの本文は固定のため、一度だけシリアライズしておく
+_HEALTH_BODY = orjson.dumps({"status": "ok"})
 
 
-def _build_health_response() -> JSONResponse:
+def _build_health_response() -> Response:
     """Generate a consistent health payload for both legacy and versioned endpoints."""
-    return JSONResponse(content={"status": "ok"})
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 @app.get("/health", tags=["Health Check"], include_in_schema=False)
@@ -37,17 +74,6 @@ async def health_check_v1():
     return _build_health_response()
 
 
-@app.on_event("startup")
-async def startup_event():
-    """アプリケーション起動時のイベント"""
-    logger.info("🚀 ERP Neuro-Marketing Service starting...")
-    shared_path = Path(settings.shared_volume_path)
-    if not shared_path.exists():
-        logger.warning(f"Shared volume path does not exist: {shared_path}")
-    else:
-        logger.info(f"Shared volume path is ready: {shared_path}")
-
-
 @app.post(
     "/api/v1/neuro-marketing/experiments/{experiment_id}/analyze",
     response_model=AnalysisResponse,
@@ -55,6 +81,7 @@ async def startup_event():
 )
 async def analyze_experiment(
     experiment_id: UUID,
+    request: Request,
     # 権限チェックをDI (Dependency Injection) を使用して実行
     authorized: bool = Depends(verify_owner_role),
     x_user_id: str = Header(..., alias="X-User-Id"),
@@ -79,7 +106,9 @@ async def analyze_experiment(
     logger.info(f"Analysis requested for experiment_id: {experiment_id}")
 
     try:
-        recommendations, summary = await run_full_analysis(experiment_id)
+        recommendations, summary, summary_key = await run_full_analysis(
+            experiment_id, get_bids_client(request)
+        )
 
         analysis_response = AnalysisResponse(
             experiment_id=experiment_id,
@@ -88,7 +117,7 @@ async def analyze_experiment(
         )
 
         try:
-            save_analysis_result(analysis_response, x_user_id)
+            await asyncio.to_thread(save_analysis_result, analysis_response, x_user_id, summary_key)
         except Exception as db_error:
             logger.error(
                 "Failed to save analysis result for experiment %s: %s. "
@@ -134,14 +163,15 @@ async def get_analysis_result(
         "Latest analysis result requested for experiment %s by %s", experiment_id, x_user_id
     )
 
-    record = get_latest_analysis_result(experiment_id)
+    # psycopg2 はブロッキングのため、イベントループを止めないようスレッドで実行する
+    record = await asyncio.to_thread(get_latest_analysis_result, experiment_id)
     if not record:
         raise HTTPException(
             status_code=404, detail="No completed analysis result found for this experiment."
         )
 
     try:
-        recommendations = [ProductRecommendation(**rec) for rec in record["recommendations"]]
+        recommendations = RECOMMENDATIONS_ADAPTER.validate_json(record["recommendations_json"])
     except (ValidationError, TypeError, ValueError, KeyError) as validation_error:
         logger.error(
             "Failed to deserialize stored analysis result for experiment %s (analysis_id=%s)",
@@ -9,11 +9,36 @@ def _get_env(name: str, default: str | None = None, *, required: bool = False) -
     return value if value is not None else ""
 
 
+def _get_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return float(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"Environment variable '{name}' must be a float.") from exc
+
+
+def _get_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return int(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"Environment variable '{name}' must be an integer.") from exc
+
+
 @dataclass(frozen=True)
 class Settings:
     database_url: str = _get_env("DATABASE_URL", required=True)
+    db_pool_min_connections: int = _get_int("DB_POOL_MIN_CONNECTIONS", 1)
+    db_pool_max_connections: int = _get_int("DB_POOL_MAX_CONNECTIONS", 8)
     bids_exporter_url: str = _get_env("BIDS_EXPORTER_URL", "http://bids_exporter:8000")
     auth_manager_url: str = _get_env("AUTH_MANAGER_URL", "http://auth_manager:3000")
+    auth_cache_ttl_seconds: float = _get_float("AUTH_CACHE_TTL_SECONDS", 30.0)
+    auth_request_timeout_seconds: float = _get_float("AUTH_REQUEST_TIMEOUT_SECONDS", 10.0)
+    bids_request_timeout_seconds: float = _get_float("BIDS_REQUEST_TIMEOUT_SECONDS", 300.0)
     shared_volume_path: str = _get_env("SHARED_VOLUME_PATH", "/export_data")
     gemini_api_key: str = _get_env("GEMINI_API_KEY", "")
 
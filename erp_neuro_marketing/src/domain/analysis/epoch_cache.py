@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from uuid import UUID
+
+import mne
+
+# --- ロガー設定 ---
+logger = logging.getLogger(__name__)
+
+# エポック作成条件やキャッシュの形式を変えたら上げる (古いエントリは参照されなくなる)
+EPOCH_CACHE_VERSION = 2
+CALIBRATION_EPOCHS_SUFFIX = "calibration-epo.fif"
+MAIN_EPOCHS_SUFFIX = "main-epo.fif"
+STIMULI_DIR = "stimuli"
+
+
+def epoch_cache_key(
+    experiment_id: UUID,
+    cal_sessions: list[dict],
+    main_sessions: list[dict],
+) -> str:
+    """
+    解析対象のセッション構成とイベントから、エポックのキャッシュキーを求める。
+    セッションの追加・削除や種別・順序の変更、イベントの再補正があればキーが変わる。
+    """
+    digest = hashlib.sha1(f"v{EPOCH_CACHE_VERSION}:{experiment_id}".encode())
+    for group, sessions in (("calibration", cal_sessions), ("main", main_sessions)):
+        for session in sessions:
+            digest.update(
+                f"|{group}:{session['session_id']}:{session['session_index']}:"
+                f"{session['session_type']}:{session['start_time']}:"
+                f"{session['events_digest']}".encode()
+            )
+    return digest.hexdigest()
+
+
+def _epochs_path(cache_dir: Path, key: str, suffix: str) -> Path:
+    return cache_dir / f"{key}-{suffix}"
+
+
+def load_cached_epochs(cache_dir: Path, key: str) -> tuple[mne.BaseEpochs, mne.BaseEpochs] | None:
+    """キャッシュ済みのキャリブレーション・本番エポックを読み込む。存在しない場合はNone。"""
+    try:
+        cal_epochs = mne.read_epochs(
+            _epochs_path(cache_dir, key, CALIBRATION_EPOCHS_SUFFIX), preload=True, verbose=False
+        )
+        main_epochs = mne.read_epochs(
+            _epochs_path(cache_dir, key, MAIN_EPOCHS_SUFFIX), preload=True, verbose=False
+        )
+    except FileNotFoundError:
+        # 未作成か、並行する解析が新しいキーで保存して削除した
+        return None
+    except Exception:
+        logger.warning(
+            "Ignoring unreadable epoch cache entry %s in %s", key, cache_dir, exc_info=True
+        )
+        return None
+    return cal_epochs, main_epochs
+
+
+def _replace_from_temp(dest: Path, write) -> None:
+    """一時ファイルに書き込んでから os.replace で置き換える (読み手が書きかけを見ないように)。"""
+    # MNE はファイル名の末尾 (-epo.fif) を検査するため、一時ファイルは接頭辞で区別する
+    tmp_path = dest.with_name(f".{uuid.uuid4().hex}.{dest.name}")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def save_cached_epochs(
+    cache_dir: Path,
+    key: str,
+    cal_epochs: mne.BaseEpochs,
+    main_epochs: mne.BaseEpochs,
+    bids_root_path: Path,
+) -> None:
+    """
+    エポックと刺激画像をキャッシュとして保存し、同じ実験の古いキーのエポックを削除する。
+    BIDSデータセットは次のエクスポートで上書きされるため、サマリー用の刺激画像も一緒に保存する。
+    """
+    stimuli_cache_dir = cache_dir / STIMULI_DIR
+    stimuli_cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # 刺激画像はエポックより先に置き、キャッシュヒットした解析が必ず参照できるようにする
+    stimuli_dir = bids_root_path / STIMULI_DIR
+    if stimuli_dir.is_dir():
+        for stimulus in stimuli_dir.iterdir():
+            if stimulus.is_file():
+                _replace_from_temp(
+                    stimuli_cache_dir / stimulus.name,
+                    lambda tmp, src=stimulus: shutil.copyfile(src, tmp),
+                )
+
+    # 再読込後も同じ予測になるよう、float64 のまま保存する
+    _replace_from_temp(
+        _epochs_path(cache_dir, key, CALIBRATION_EPOCHS_SUFFIX),
+        lambda tmp: cal_epochs.save(tmp, fmt="double", verbose=False),
+    )
+    _replace_from_temp(
+        _epochs_path(cache_dir, key, MAIN_EPOCHS_SUFFIX),
+        lambda tmp: main_epochs.save(tmp, fmt="double", verbose=False),
+    )
+
+    # 古いキーのエポックを削除する。ファイル単位の削除なので、読み込み中の解析は開いた
+    # ファイルを読み切れ、これから開く解析は FileNotFoundError でキャッシュミスになる
+    for stale_path in cache_dir.glob("*-epo.fif"):
+        if not stale_path.name.startswith((key, ".")):
+            stale_path.unlink(missing_ok=True)
+    logger.info("Saved epoch cache entry %s in %s", key, cache_dir)
@@ -1,25 +1,27 @@
 import os
-import pickle
 
+import joblib
 import mne
 import numpy as np
-from mne.decoding import Vectorizer
-from sklearn.dummy import DummyClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import make_pipeline
-from sklearn.preprocessing import StandardScaler
 
 
 class ErpDetector:
     """Trains an ERP detection model."""
 
-    def __init__(self, epochs: mne.Epochs, save_path: str):
+    def __init__(self, epochs: mne.BaseEpochs, save_path: str):
         self.epochs = epochs
         self.save_path = save_path
         self.clf = self._train()
         self._save_model()
 
     def _train(self):
+        # scikit-learn は学習時にのみ読み込み、サービス起動を軽くする
+        from mne.decoding import Vectorizer
+        from sklearn.dummy import DummyClassifier
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
         X = self.epochs.get_data(picks="eeg")
         y = self.epochs.events[:, -1]
 
@@ -42,7 +44,11 @@ class ErpDetector:
             clf_pipeline = make_pipeline(
                 Vectorizer(),  # (n_epochs, n_channels, n_times) -> (n_epochs, n_features)
                 StandardScaler(),  # スケーリング
-                LogisticRegression(solver="liblinear", random_state=42),
+                # lbfgs は BLAS の行列演算で勾配を計算するため、特徴量数が多いERPでも高速に収束する
+                # (数千次元の特徴量でも十数回で収束するため max_iter=200 で足りる)。
+                # lbfgs は入力を float64 に変換するため float32 化の効果はなく、
+                # 全クラスを1回の最適化で解くため n_jobs も使われない (どちらも指定しない)
+                LogisticRegression(solver="lbfgs", max_iter=200, random_state=42),
             )
 
         clf_pipeline.fit(X, y)
@@ -52,24 +58,32 @@ class ErpDetector:
 
     def _save_model(self):
         os.makedirs(self.save_path, exist_ok=True)
-        model_file = os.path.join(self.save_path, "model.pkl")
-        with open(model_file, "wb") as f:
-            pickle.dump(self.clf, f)
+        model_file = os.path.join(self.save_path, "model.joblib")
+        # 非圧縮で書き出し、joblib.load(mmap_mode="r") で係数をゼロコピー読み込みできるようにする
+        joblib.dump(self.clf, model_file, compress=0)
         print(f"Model saved to {model_file}")
 
 
 class EmoSpecEstimator:
     """Estimates emotion spectrum using a pre-trained ERP model."""
 
-    def __init__(self, clf, epochs: mne.Epochs):
+    def __init__(self, clf, epochs: mne.BaseEpochs):
         self.clf = clf
         self.epochs = epochs
+        # 陽性クラスらしさのスコア (decision_function が使える場合のみ、ランキング用)
+        self.scores: np.ndarray | None = None
         self.result = self._predict()
 
     def _predict(self):
-        X = self.epochs.get_data(picks="eeg")
-        # Positive class (target) の確率を予測
-        # event_idのマッピングに注意。'target'が1, 'nontarget'が0など。
-        # ここでは単純にpredict()を使い、陽性クラスを1と仮定
-        predictions = self.clf.predict(X)
-        return predictions
+        X = self.epochs.get_data(picks="eeg", copy=False)
+        if not hasattr(self.clf, "decision_function"):
+            # DummyClassifier へフォールバックした場合は decision_function を持たない
+            return self.clf.predict(X)
+
+        # decision_function を一度だけ計算し、predict() と同じ規則でクラスラベルへ変換する
+        self.scores = self.clf.decision_function(X)
+        if self.scores.ndim > 1:
+            class_indices = self.scores.argmax(axis=1)
+        else:
+            class_indices = (self.scores > 0).astype(np.intp)
+        return self.clf.classes_[class_indices]
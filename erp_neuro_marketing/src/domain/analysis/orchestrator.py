@@ -1,16 +1,27 @@
 import asyncio
+import hashlib
 import logging
 import mimetypes
 from pathlib import Path
 from typing import Any, cast
 from uuid import UUID
 
+import httpx
+import mne
+import numpy as np
 import pandas as pd
 from fastapi import HTTPException
 
+from ...app.schemas import ProductRecommendation
 from ...config.env import settings
 from ...infrastructure.bids_client import BidsCreationError, request_bids_creation
-from ...infrastructure.db import get_db_connection, get_db_cursor
+from ...infrastructure.db import (
+    get_cached_summary,
+    get_db_connection,
+    get_db_cursor,
+    get_product_details_from_db,
+)
+from .epoch_cache import STIMULI_DIR, epoch_cache_key, load_cached_epochs, save_cached_epochs
 from .models import EmoSpecEstimator, ErpDetector
 from .preprocess import create_epochs_from_bids
 
@@ -28,19 +39,26 @@ types = cast(Any, types)
 logger = logging.getLogger(__name__)
 
 MAIN_SESSION_TYPES = {"main", "main_integrated", "main_external", "main_task"}
+_INVALID_STIM_FILE_NAMES = frozenset({"", "n/a"})
+# サマリーのプロンプトやモデルを変えたら上げる (保存済みのサマリーは再利用されなくなる)
+SUMMARY_CACHE_VERSION = 1
 
 
-async def generate_ai_summary(recommendations: list[dict]) -> str:
+async def generate_ai_summary(recommendations: list[dict]) -> tuple[str, bool]:
+    """
+    推奨商品のサマリーを返す。2番目の値は Gemini が生成したサマリーかどうか
+    (False の場合は既定文・失敗時の文言で、再利用の対象にしない)。
+    """
     if not recommendations:
         return (
             "ユーザーが高い関心を示した特定の製品は見つかりませんでした。"
             "キャリブレーションデータや計測条件をご確認ください。"
-        )
+        ), False
 
     try:
         if not settings.gemini_api_key or genai is None or types is None:
             logger.warning("GEMINI_API_KEY is not set. Returning a default summary.")
-            return f"解析の結果、{len(recommendations)}件の製品に高い関心が示されました。"
+            return f"解析の結果、{len(recommendations)}件の製品に高い関心が示されました。", False
 
         # 1. プロンプトの準備
         product_descriptions = [
@@ -67,32 +85,34 @@ async def generate_ai_summary(recommendations: list[dict]) -> str:
         genai_client = cast(Any, genai)
         types_module = cast(Any, types)
 
+        # 添付する商品画像は Gemini 呼び出しの前にまとめて並列に読み込んでおく
+        max_images = 10
+        image_paths = [item["image_path"] for item in recommendations if item.get("image_path")]
+        del image_paths[max_images:]
+        loaded_images = await asyncio.gather(
+            *(asyncio.to_thread(Path(image_path).read_bytes) for image_path in image_paths),
+            return_exceptions=True,
+        )
+        images: list[tuple[bytes, str]] = []
+        for image_path, image_data in zip(image_paths, loaded_images, strict=True):
+            if isinstance(image_data, Exception):
+                logger.warning(
+                    "Failed to attach image '%s' for Gemini summary: %s",
+                    image_path,
+                    image_data,
+                )
+                continue
+            mime_type, _ = mimetypes.guess_type(image_path)
+            images.append((image_data, mime_type or "image/png"))
+
         def _generate():
             client = genai_client.Client(api_key=settings.gemini_api_key)
             prompt = f"{system_prompt}\n\n{user_prompt}"
             contents = [types_module.Part.from_text(text=prompt)]
-            max_images = 10
-            attached_images = 0
-            for item in recommendations:
-                if attached_images >= max_images:
-                    break
-                image_path = item.get("image_path")
-                if not image_path:
-                    continue
-                try:
-                    image_data = Path(image_path).read_bytes()
-                    mime_type, _ = mimetypes.guess_type(image_path)
-                    mime_type = mime_type or "image/png"
-                    contents.append(
-                        types_module.Part.from_bytes(data=image_data, mime_type=mime_type)
-                    )
-                    attached_images += 1
-                except Exception as exc:
-                    logger.warning(
-                        "Failed to attach image '%s' for Gemini summary: %s",
-                        image_path,
-                        exc,
-                    )
+            contents.extend(
+                types_module.Part.from_bytes(data=image_data, mime_type=mime_type)
+                for image_data, mime_type in images
+            )
             response = client.models.generate_content(
                 model="models/gemini-2.5-flash",
                 contents=contents,
@@ -111,7 +131,9 @@ async def generate_ai_summary(recommendations: list[dict]) -> str:
                     asyncio.to_thread(_generate),
                     timeout=timeout_seconds,
                 )
-                return summary.strip() or fallback_summary
+                if summary.strip():
+                    return summary.strip(), True
+                return fallback_summary, False
             except TimeoutError:
                 logger.error(
                     "Gemini API call timed out after %.1f seconds (attempt %d/%d)",
@@ -140,120 +162,113 @@ async def generate_ai_summary(recommendations: list[dict]) -> str:
             if attempt < max_retries:
                 await asyncio.sleep(backoff_seconds)
                 backoff_seconds = min(backoff_seconds * 2, 10.0)
-        return f"{fallback_summary}(AIサマリーの生成に失敗しました)"
+        return f"{fallback_summary}(AIサマリーの生成に失敗しました)", False
 
     except Exception:
         logger.exception("An unexpected error occurred during AI summary generation")
         return (
             f"解析の結果、{len(recommendations)}件の製品に高い関心が示されました。"
             "(AIサマリーの生成中にエラー発生)"
-        )
+        ), False
 
 
-async def _load_experiment_metadata(experiment_id: UUID) -> tuple[pd.DataFrame, pd.DataFrame]:
-    def _query() -> tuple[pd.DataFrame, pd.DataFrame]:
+async def _load_experiment_metadata(
+    experiment_id: UUID,
+) -> tuple[bool, list[dict], list[dict], bool]:
+    def _query() -> tuple[bool, list[dict], list[dict], bool]:
+        # セッション種別の正規化・振り分けと開始時刻順の番号付けを SQL 側で行い、
+        # キャリブレーション/本番のセッションと刺激の有無を1回の往復で取得する
+        # (刺激の詳細は検出後に該当ファイル分だけ取得する)
         with get_db_connection() as conn:
             with get_db_cursor(conn) as cur:
                 cur.execute(
                     """
-                    SELECT DISTINCT ON (s.session_id)
-                           s.session_id,
-                           s.user_id,
-                           s.session_type,
-                           s.start_time
-                    FROM sessions s
-                    JOIN session_events se ON s.session_id = se.session_id
-                    WHERE s.experiment_id = %s
-                      AND s.event_correction_status = 'completed'
-                    ORDER BY s.session_id, s.start_time ASC
+                    SELECT
+                        COUNT(*) > 0 AS has_sessions,
+                        COALESCE(
+                            json_agg(s ORDER BY s.start_time)
+                                FILTER (WHERE s.session_type_clean = 'calibration'),
+                            '[]'::json
+                        ) AS calibration_sessions,
+                        COALESCE(
+                            json_agg(s ORDER BY s.start_time)
+                                FILTER (WHERE s.session_type_clean = ANY(%(main_types)s)),
+                            '[]'::json
+                        ) AS main_sessions,
+                        EXISTS (
+                            SELECT 1 FROM experiment_stimuli
+                            WHERE experiment_id = %(experiment_id)s
+                        ) AS has_stimuli
+                    FROM (
+                        SELECT s.session_id, s.user_id, s.session_type, s.start_time,
+                               LOWER(TRIM(COALESCE(s.session_type, ''))) AS session_type_clean,
+                               ROW_NUMBER() OVER (ORDER BY s.start_time) AS session_index,
+                               ev.events_digest
+                        FROM sessions s
+                        -- イベント行のハッシュ (エポックキャッシュのキーに使う)。
+                        -- イベントが無いセッションは NULL になり除外される
+                        CROSS JOIN LATERAL (
+                            SELECT md5(string_agg(
+                                       concat_ws(':', se.event_id, se.onset, se.duration,
+                                                 se.onset_corrected_us, se.trial_type,
+                                                 se.value, se.stimulus_id,
+                                                 se.calibration_item_id),
+                                       ',' ORDER BY se.event_id
+                                   )) AS events_digest
+                            FROM session_events se
+                            WHERE se.session_id = s.session_id
+                        ) ev
+                        WHERE s.experiment_id = %(experiment_id)s
+                          AND s.event_correction_status = 'completed'
+                          AND ev.events_digest IS NOT NULL
+                    ) s
                     """,
-                    (str(experiment_id),),
+                    {
+                        "experiment_id": str(experiment_id),
+                        "main_types": sorted(MAIN_SESSION_TYPES),
+                    },
                 )
-                sessions_rows = cur.fetchall()
+                row = cur.fetchone()
 
-                cur.execute(
-                    """
-                    SELECT stimulus_id, file_name, trial_type, item_name, brand_name,
-                           description, category, gender
-                    FROM experiment_stimuli
-                    WHERE experiment_id = %s
-                    """,
-                    (str(experiment_id),),
-                )
-                stimuli_rows = cur.fetchall()
-
-        session_columns = ["session_id", "user_id", "session_type", "start_time"]
-        sessions_df = (
-            pd.DataFrame(sessions_rows, columns=session_columns)
-            if sessions_rows
-            else pd.DataFrame(columns=session_columns)
-        )
-        stimuli_columns = [
-            "stimulus_id",
-            "file_name",
-            "trial_type",
-            "item_name",
-            "brand_name",
-            "description",
-            "category",
-            "gender",
-        ]
-        stimuli_df = (
-            pd.DataFrame(stimuli_rows, columns=stimuli_columns)
-            if stimuli_rows
-            else pd.DataFrame(columns=stimuli_columns)
+        return (
+            row["has_sessions"],
+            row["calibration_sessions"],
+            row["main_sessions"],
+            row["has_stimuli"],
         )
 
-        if not sessions_df.empty and "start_time" in sessions_df.columns:
-            sessions_df = sessions_df.sort_values("start_time").reset_index(drop=True)
-            sessions_df["session_index"] = range(1, len(sessions_df) + 1)
-
-        return sessions_df, stimuli_df
-
     return await asyncio.to_thread(_query)
 
 
-async def run_full_analysis(
-    experiment_id: UUID,
-) -> tuple[list[dict], str]:
-    logger.info(f"Starting full analysis for experiment: {experiment_id}")
-
-    sessions_df, stimuli_df = await _load_experiment_metadata(experiment_id)
-
-    if sessions_df.empty:
-        raise HTTPException(
-            status_code=404,
-            detail="No completed sessions with valid events found for this experiment.",
-        )
-
-    sessions_df["session_type_clean"] = (
-        sessions_df["session_type"].fillna("").astype(str).str.strip().str.lower()
-    )
+async def _load_detected_products(
+    experiment_id: UUID, file_names: list[str]
+) -> list[ProductRecommendation]:
+    def _query() -> list[ProductRecommendation]:
+        with get_db_connection() as conn:
+            return get_product_details_from_db(conn, experiment_id, file_names)
 
-    cal_sessions_df = sessions_df[sessions_df["session_type_clean"] == "calibration"].copy()
-    main_sessions_df = sessions_df[
-        sessions_df["session_type_clean"].isin(MAIN_SESSION_TYPES)
-    ].copy()
+    return await asyncio.to_thread(_query)
 
-    if cal_sessions_df.empty:
-        raise HTTPException(
-            status_code=404,
-            detail="No completed calibration sessions with valid events found.",
-        )
 
-    if main_sessions_df.empty:
-        raise HTTPException(
-            status_code=404,
-            detail="No completed main task sessions with valid events found.",
-        )
+def _summary_cache_key(recommendations: list[ProductRecommendation]) -> str:
+    """推奨商品の組 (プロンプトに使う名称を含む) が同じなら同じ値になるサマリーのキー。"""
+    digest = hashlib.sha1(f"v{SUMMARY_CACHE_VERSION}".encode())
+    for file_name, brand_name, item_name in sorted(
+        (r.file_name, r.brand_name or "", r.item_name or "") for r in recommendations
+    ):
+        digest.update(f"\n{file_name}\t{brand_name}\t{item_name}".encode())
+    return digest.hexdigest()
 
-    if stimuli_df.empty:
-        raise HTTPException(
-            status_code=404, detail="No stimuli (products) found for this experiment."
-        )
 
+async def _build_epochs(
+    bids_client: httpx.AsyncClient,
+    experiment_id: UUID,
+    cal_sessions: list[dict],
+    main_sessions: list[dict],
+) -> tuple[mne.BaseEpochs, mne.BaseEpochs, Path]:
+    """BIDSデータセットを生成させ、キャリブレーションと本番のエポックを作成する。"""
     try:
-        bids_response = await request_bids_creation(experiment_id)
+        bids_response = await request_bids_creation(bids_client, experiment_id)
         bids_root_path_str = bids_response["bids_path"]
     except BidsCreationError as e:
         logger.error(
@@ -273,15 +288,20 @@ async def run_full_analysis(
 
     logger.info(f"BIDS dataset is ready at: {bids_root_path}")
 
-    cal_epochs = create_epochs_from_bids(
-        bids_root_path=bids_root_path,
-        sessions_df=cal_sessions_df,
-        default_task="calibration",
-    )
-    main_epochs = create_epochs_from_bids(
-        bids_root_path=bids_root_path,
-        sessions_df=main_sessions_df,
-        default_task="main",
+    # キャリブレーションと本番のエポック作成は互いに独立しているため、並行して実行する
+    cal_epochs, main_epochs = await asyncio.gather(
+        asyncio.to_thread(
+            create_epochs_from_bids,
+            bids_root_path=bids_root_path,
+            sessions=cal_sessions,
+            default_task="calibration",
+        ),
+        asyncio.to_thread(
+            create_epochs_from_bids,
+            bids_root_path=bids_root_path,
+            sessions=main_sessions,
+            default_task="main",
+        ),
     )
     if cal_epochs is None or len(cal_epochs) == 0:
         raise HTTPException(
@@ -306,9 +326,71 @@ async def run_full_analysis(
         len(main_epochs),
     )
 
+    return cal_epochs, main_epochs, bids_root_path
+
+
+async def run_full_analysis(
+    experiment_id: UUID,
+    bids_client: httpx.AsyncClient,
+) -> tuple[list[ProductRecommendation], str, str | None]:
+    """
+    実験の解析を実行し、推奨商品・サマリー・サマリーの再利用キーを返す。
+    再利用キーは Gemini が生成したサマリーの場合のみ設定される。
+    """
+    logger.info(f"Starting full analysis for experiment: {experiment_id}")
+
+    has_sessions, cal_sessions, main_sessions, has_stimuli = await _load_experiment_metadata(
+        experiment_id
+    )
+
+    if not has_sessions:
+        raise HTTPException(
+            status_code=404,
+            detail="No completed sessions with valid events found for this experiment.",
+        )
+
+    if not cal_sessions:
+        raise HTTPException(
+            status_code=404,
+            detail="No completed calibration sessions with valid events found.",
+        )
+
+    if not main_sessions:
+        raise HTTPException(
+            status_code=404,
+            detail="No completed main task sessions with valid events found.",
+        )
+
+    if not has_stimuli:
+        raise HTTPException(
+            status_code=404, detail="No stimuli (products) found for this experiment."
+        )
+
+    # セッション構成とイベントが前回の解析と同じなら、BIDS生成とエポック作成を省略する
+    cache_dir = Path(settings.shared_volume_path) / "cache" / "epochs" / str(experiment_id)
+    cache_key = epoch_cache_key(experiment_id, cal_sessions, main_sessions)
+    cached_epochs = await asyncio.to_thread(load_cached_epochs, cache_dir, cache_key)
+    if cached_epochs is not None:
+        logger.info("Reusing cached epochs %s from %s", cache_key, cache_dir)
+        cal_epochs, main_epochs = cached_epochs
+        stimuli_root = cache_dir
+    else:
+        cal_epochs, main_epochs, bids_root_path = await _build_epochs(
+            bids_client, experiment_id, cal_sessions, main_sessions
+        )
+        stimuli_root = bids_root_path
+        try:
+            await asyncio.to_thread(
+                save_cached_epochs, cache_dir, cache_key, cal_epochs, main_epochs, bids_root_path
+            )
+        except Exception:
+            logger.warning("Failed to cache epochs for experiment %s", experiment_id, exc_info=True)
+
     model_dir = Path(settings.shared_volume_path) / "models" / str(experiment_id)
-    erp_detector = ErpDetector(cal_epochs, save_path=str(model_dir))
-    emo_estimator = EmoSpecEstimator(erp_detector.clf, main_epochs)
+    # 学習・モデル保存・推論は CPU とディスク I/O を占有するため、イベントループを塞がないよう
+    # スレッドで実行する
+    erp_detector = await asyncio.to_thread(ErpDetector, cal_epochs, save_path=str(model_dir))
+    emo_estimator = await asyncio.to_thread(EmoSpecEstimator, erp_detector.clf, main_epochs)
 
     predictions = emo_estimator.result
     if main_epochs.metadata is None:
@@ -316,28 +398,30 @@ async def run_full_analysis(
             status_code=500, detail="Epoch metadata is missing for main task sessions."
         )
 
-    main_epochs_df = main_epochs.metadata.copy()
-    main_epochs_df["prediction"] = predictions
-
-    detected_events = main_epochs_df[main_epochs_df["prediction"] == 1]
+    # 陽性と判定されたエポックの stim_file を numpy 配列で取り出し、1パスでファイル名へ変換する
+    detected_stim_files = pd.unique(
+        main_epochs.metadata["stim_file"].to_numpy(dtype=object)[np.asarray(predictions) == 1]
+    )
 
-    recommendations: list[dict] = []
-    if not detected_events.empty:
-        detected_files_series = (
-            detected_events["stim_file"].astype(str).str.split("/").str[-1].str.strip()
-        )
-        detected_files = [name for name in detected_files_series.unique() if name and name != "n/a"]
+    recommendations: list[ProductRecommendation] = []
+    if detected_stim_files.size:
+        # 'n/a' は分割すると 'a' になってしまうため、ファイル名を取り出す前に除外する
+        detected_files = [
+            stim_file.rsplit("/", 1)[-1].strip()
+            for stim_file in detected_stim_files
+            if isinstance(stim_file, str) and stim_file.strip() not in _INVALID_STIM_FILE_NAMES
+        ]
 
         if detected_files:
-            recommended_df = stimuli_df[stimuli_df["file_name"].isin(detected_files)]
-            recommendations = recommended_df.to_dict("records")
+            # 検出されたファイル名の分だけを1回のクエリでまとめて取得する
+            recommendations = await _load_detected_products(experiment_id, detected_files)
 
             recommendations_for_summary: list[dict] = []
             for record in recommendations:
-                enriched = record.copy()
-                file_name = record.get("file_name")
+                enriched = record.model_dump()
+                file_name = record.file_name
                 if file_name:
-                    image_path = bids_root_path / "stimuli" / file_name
+                    image_path = stimuli_root / STIMULI_DIR / file_name
                     if image_path.exists():
                         enriched["image_path"] = str(image_path)
                     else:
@@ -352,8 +436,28 @@ async def run_full_analysis(
     else:
         recommendations_for_summary = []
 
-    summary = await generate_ai_summary(recommendations_for_summary)
+    # 同じ推奨商品の組に対して生成済みのサマリーがあれば、Gemini の呼び出しを省略する
+    summary_key: str | None = None
+    cached_summary: str | None = None
+    if recommendations_for_summary:
+        summary_key = _summary_cache_key(recommendations)
+        try:
+            cached_summary = await asyncio.to_thread(get_cached_summary, experiment_id, summary_key)
+        except Exception:
+            logger.warning(
+                "Failed to look up a cached summary for experiment %s",
+                experiment_id,
+                exc_info=True,
+            )
+
+    if cached_summary is not None:
+        logger.info("Reusing the stored AI summary for experiment %s.", experiment_id)
+        summary = cached_summary
+    else:
+        summary, generated = await generate_ai_summary(recommendations_for_summary)
+        if not generated:
+            summary_key = None
 
     logger.info(f"Analysis complete. Found {len(recommendations)} recommendations.")
 
-    return recommendations, summary
+    return recommendations, summary, summary_key
@@ -1,13 +1,20 @@
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import mne
+import numpy as np
 import pandas as pd
 from mne_bids import BIDSPath, read_raw_bids
 
 # --- ロガー設定 ---
 logger = logging.getLogger(__name__)
 
+SESSION_LOAD_WORKERS = min(8, os.cpu_count() or 1)
+# events.tsv のうちエポック作成とメタデータに使う列とその型
+EVENTS_TSV_DTYPES = {"onset": np.float64, "trial_type": str, "stim_file": str}
+
 
 def _sanitize_task_name(raw_task: str | None, default_task: str) -> str:
     """Sanitize the task name to match the naming used during BIDS export."""
@@ -19,143 +26,225 @@ def _sanitize_task_name(raw_task: str | None, default_task: str) -> str:
     return sanitized or "defaulttask"
 
 
+def _load_session_epochs(
+    bids_root_path: Path,
+    row: dict,
+    default_task: str,
+    tmin: float,
+    tmax: float,
+    baseline: tuple | None,
+) -> mne.Epochs | None:
+    """1セッション分のBIDSデータを読み込み、Epochsを生成する。対象外の場合はNone。"""
+    subject_id = row["user_id"].replace("-", "")
+    session_index = row.get("session_index")
+    if session_index is None:
+        logger.warning(
+            "Session %s is missing a session_index. Skipping as BIDS alignment is ambiguous.",
+            row.get("session_id", "unknown"),
+        )
+        return None
+
+    session_label = str(session_index)
+    task_name = _sanitize_task_name(row.get("session_type"), default_task)
+
+    try:
+        bids_path = BIDSPath(
+            subject=subject_id,
+            session=session_label,
+            task=task_name,
+            datatype="eeg",
+            root=bids_root_path,
+        )
+
+        logger.info("Reading BIDS data from: %s", bids_path.directory)
+        raw = read_raw_bids(bids_path=bids_path, verbose=False)
+        raw = raw.copy()
+
+        bad_channels = raw.info.get("bads", [])
+        if bad_channels:
+            if len(bad_channels) >= len(raw.ch_names):
+                logger.warning(
+                    "All channels for sub-%s, ses-%s are marked bad. Skipping session.",
+                    subject_id,
+                    session_label,
+                )
+                return None
+            logger.info("Dropping bad channels for subject %s: %s", subject_id, bad_channels)
+            raw.drop_channels(bad_channels)
+
+        picks = mne.pick_types(raw.info, eeg=True, eog=True, emg=True, meg=False, stim=False)
+        if len(picks) == 0:
+            logger.warning(
+                "No usable EEG/EMG/EOG channels remain after dropping bad channels for %s. "
+                "Skipping.",
+                bids_path,
+            )
+            return None
+        raw.pick(picks=picks)
+
+        events_path = bids_path.copy().update(suffix="events", extension=".tsv")
+        if not events_path.fpath.exists():
+            logger.warning("No events file found for %s. Skipping this session.", bids_path)
+            return None
+
+        events_df = pd.read_csv(
+            events_path.fpath,
+            sep="\t",
+            engine="c",
+            usecols=list(EVENTS_TSV_DTYPES),
+            dtype=EVENTS_TSV_DTYPES,
+        )
+        if events_df.empty:
+            logger.warning("No events could be parsed for %s. Skipping.", bids_path)
+            return None
+
+        # trial_type を出現順に 1 始まりのイベントIDへ割り当て、イベント配列を一括で組み立てる
+        trial_type_codes, unique_trial_types = pd.factorize(
+            events_df["trial_type"], use_na_sentinel=False
+        )
+        event_id_map = {trial_type: idx for idx, trial_type in enumerate(unique_trial_types, 1)}
+        events = np.column_stack(
+            [
+                (events_df["onset"].to_numpy() * raw.info["sfreq"]).astype(np.int64),
+                np.zeros(len(events_df), dtype=np.int64),
+                trial_type_codes.astype(np.int64) + 1,
+            ]
+        )
+
+        metadata_df = events_df[["trial_type", "stim_file"]].copy()
+        metadata_df["stim_file"] = metadata_df["stim_file"].fillna("n/a")
+        metadata_df["session_id"] = row["session_id"]
+        metadata_df["user_id"] = row["user_id"]
+        metadata_df["session_type"] = row.get("session_type", default_task)
+
+        epochs = mne.Epochs(
+            raw,
+            events=events,
+            event_id=event_id_map,
+            tmin=tmin,
+            tmax=tmax,
+            baseline=baseline,
+            preload=True,
+            metadata=metadata_df,
+            verbose=False,
+        )
+        logger.info(
+            "Successfully created %s epochs for sub-%s, ses-%s, task-%s",
+            len(epochs),
+            subject_id,
+            session_label,
+            task_name,
+        )
+        return epochs
+
+    except FileNotFoundError:
+        logger.warning(
+            "BIDS data not found for subject '%s', session '%s', task '%s'. Skipping.",
+            subject_id,
+            session_label,
+            task_name,
+        )
+        return None
+    except Exception as e:
+        logger.error(
+            "Error processing BIDS data for sub-%s, ses-%s: %s",
+            subject_id,
+            session_label,
+            e,
+        )
+        import traceback
+
+        traceback.print_exc()
+        return None
+
+
+def _concatenate_session_epochs(all_epochs: list[mne.Epochs]) -> mne.EpochsArray:
+    """
+    セッション毎のEpochsを、事前確保した1つの配列へ1回だけコピーして結合する。
+    trial_type のイベントIDはセッション間で出現順に統合し直す。
+    """
+    first = all_epochs[0]
+    for epochs in all_epochs[1:]:
+        if epochs.ch_names != first.ch_names or len(epochs.times) != len(first.times):
+            raise ValueError("Epochs from all sessions must share the same channels and times.")
+
+    event_id: dict[str, int] = {}
+    for epochs in all_epochs:
+        for trial_type in epochs.event_id:
+            event_id.setdefault(trial_type, len(event_id) + 1)
+
+    n_total = sum(len(epochs) for epochs in all_epochs)
+    n_times = len(first.times)
+    # EpochsArray は float64 で保持するため、最終的な dtype で確保して再変換を避ける
+    data = np.empty((n_total, len(first.ch_names), n_times), dtype=np.float64)
+    events = np.zeros((n_total, 3), dtype=np.int64)
+    offset = 0
+    sample_offset = 0
+    for epochs in all_epochs:
+        n_epochs = len(epochs)
+        data[offset : offset + n_epochs] = epochs.get_data(copy=False)
+
+        session_events = epochs.events
+        code_lookup = np.zeros(session_events[:, 2].max() + 1, dtype=np.int64)
+        for trial_type, code in epochs.event_id.items():
+            code_lookup[code] = event_id[trial_type]
+        # イベントのサンプル位置がセッション間で重複しないようにずらす
+        events[offset : offset + n_epochs, 0] = session_events[:, 0] + sample_offset
+        events[offset : offset + n_epochs, 2] = code_lookup[session_events[:, 2]]
+        sample_offset = events[offset : offset + n_epochs, 0].max() + n_times
+        offset += n_epochs
+
+    metadata = None
+    if all(epochs.metadata is not None for epochs in all_epochs):
+        metadata = pd.concat([epochs.metadata for epochs in all_epochs], ignore_index=True)
+
+    # ベースライン補正はセッション毎に適用済み
+    return mne.EpochsArray(
+        data,
+        info=first.info,
+        events=events,
+        event_id=event_id,
+        tmin=first.tmin,
+        baseline=None,
+        metadata=metadata,
+        verbose=False,
+    )
+
+
 def create_epochs_from_bids(
     bids_root_path: Path,
-    sessions_df: pd.DataFrame,
+    sessions: list[dict],
     default_task: str,
     tmin: float = -0.2,
     tmax: float = 0.8,
     baseline: tuple | None = (-0.2, 0),
-) -> mne.Epochs | None:
+) -> mne.BaseEpochs | None:
     """
     BIDSデータセットからMNEのEpochsオブジェクトを生成・結合する。
 
     :param bids_root_path: BIDSデータセットのルートディレクトリのパス
-    :param sessions_df: 対象となるセッション情報を含むDataFrame ('session_id', 'user_id')
+    :param sessions: 対象セッション情報の辞書のリスト ('session_id', 'user_id', 'session_index')
     :param default_task: BIDSの task エンティティ名の初期値 (例: 'calibration', 'main')
     :param tmin: Epochの開始時間 (秒)
     :param tmax: Epochの終了時間 (秒)
     :param baseline: ベースライン補正の期間 (秒)
     :return: 結合されたMNE Epochsオブジェクト。対象データがない場合はNone。
     """
-    all_epochs = []
-
-    for row in sessions_df.itertuples(index=False):
-        subject_id = row.user_id.replace("-", "")
-        session_index = getattr(row, "session_index", None)
-        if session_index is None:
-            logger.warning(
-                "Session %s is missing a session_index. Skipping as BIDS alignment is ambiguous.",
-                getattr(row, "session_id", "unknown"),
-            )
-            continue
-
-        session_label = str(session_index)
-        task_name = _sanitize_task_name(getattr(row, "session_type", None), default_task)
-
-        try:
-            bids_path = BIDSPath(
-                subject=subject_id,
-                session=session_label,
-                task=task_name,
-                datatype="eeg",
-                root=bids_root_path,
-            )
-
-            logger.info("Reading BIDS data from: %s", bids_path.directory)
-            raw = read_raw_bids(bids_path=bids_path, verbose=False)
-            raw = raw.copy()
-
-            bad_channels = raw.info.get("bads", [])
-            if bad_channels:
-                if len(bad_channels) >= len(raw.ch_names):
-                    logger.warning(
-                        "All channels for sub-%s, ses-%s are marked bad. Skipping session.",
-                        subject_id,
-                        session_label,
-                    )
-                    continue
-                logger.info("Dropping bad channels for subject %s: %s", subject_id, bad_channels)
-                raw.drop_channels(bad_channels)
-
-            picks = mne.pick_types(raw.info, eeg=True, eog=True, emg=True, meg=False, stim=False)
-            if len(picks) == 0:
-                logger.warning(
-                    "No usable EEG/EMG/EOG channels remain after dropping bad channels for %s. "
-                    "Skipping.",
-                    bids_path,
-                )
-                continue
-            raw.pick(picks=picks)
-
-            events_path = bids_path.copy().update(suffix="events", extension=".tsv")
-            if not events_path.fpath.exists():
-                logger.warning("No events file found for %s. Skipping this session.", bids_path)
-                continue
-
-            events_df = pd.read_csv(events_path.fpath, sep="\t")
-
-            events = []
-            event_id_map = {}
-
-            unique_trial_types = events_df["trial_type"].unique()
-            for idx, trial_type in enumerate(unique_trial_types, 1):
-                event_id_map[trial_type] = idx
-
-            for _, event_row in events_df.iterrows():
-                onset_sample = int(event_row["onset"] * raw.info["sfreq"])
-                event_id = event_id_map[event_row["trial_type"]]
-                events.append([onset_sample, 0, event_id])
-
-            if not events:
-                logger.warning("No events could be parsed for %s. Skipping.", bids_path)
-                continue
-
-            metadata_df = events_df[["trial_type", "stim_file"]].copy()
-            metadata_df["stim_file"] = metadata_df["stim_file"].fillna("n/a")
-            metadata_df["session_id"] = row.session_id
-            metadata_df["user_id"] = row.user_id
-            metadata_df["session_type"] = getattr(row, "session_type", default_task)
-
-            epochs = mne.Epochs(
-                raw,
-                events=events,
-                event_id=event_id_map,
-                tmin=tmin,
-                tmax=tmax,
-                baseline=baseline,
-                preload=True,
-                metadata=metadata_df,
-                verbose=False,
-            )
-            all_epochs.append(epochs)
-            logger.info(
-                "Successfully created %s epochs for sub-%s, ses-%s, task-%s",
-                len(epochs),
-                subject_id,
-                session_label,
-                task_name,
-            )
+    if not sessions:
+        logger.warning("No epochs were created for task '%s'.", default_task)
+        return None
 
-        except FileNotFoundError:
-            logger.warning(
-                "BIDS data not found for subject '%s', session '%s', task '%s'. Skipping.",
-                subject_id,
-                session_label,
-                task_name,
+    # セッション毎の読み込みはファイルI/Oが中心のため、スレッドで並列化する (結果の順序は維持)
+    with ThreadPoolExecutor(max_workers=min(SESSION_LOAD_WORKERS, len(sessions))) as executor:
+        loaded_epochs = list(
+            executor.map(
+                lambda row: _load_session_epochs(
+                    bids_root_path, row, default_task, tmin, tmax, baseline
+                ),
+                sessions,
             )
-            continue
-        except Exception as e:
-            logger.error(
-                "Error processing BIDS data for sub-%s, ses-%s: %s",
-                subject_id,
-                session_label,
-                e,
-            )
-            import traceback
-
-            traceback.print_exc()
-            continue
+        )
+    all_epochs = [epochs for epochs in loaded_epochs if epochs is not None and len(epochs) > 0]
 
     if not all_epochs:
         logger.warning("No epochs were created for task '%s'.", default_task)
@@ -163,4 +252,4 @@ def create_epochs_from_bids(
 
     # すべてのEpochsを結合して返す
     logger.info(f"Concatenating a total of {len(all_epochs)} Epochs objects.")
-    return mne.concatenate_epochs(all_epochs, verbose=False)
+    return _concatenate_session_epochs(all_epochs)
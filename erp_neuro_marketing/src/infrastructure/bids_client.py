@@ -1,8 +1,15 @@
 from uuid import UUID
 
 import httpx
+import orjson
 
 from ..config.env import settings
+from .resilience import (
+    SERVER_ERROR_STATUS_CODES,
+    CircuitBreaker,
+    CircuitOpenError,
+    post_with_retry,
+)
 
 
 class BidsCreationError(Exception):
@@ -11,28 +18,45 @@ class BidsCreationError(Exception):
     pass
 
 
-async def request_bids_creation(experiment_id: UUID) -> dict:
+_breaker = CircuitBreaker("bids_exporter")
+
+
+def create_bids_client() -> httpx.AsyncClient:
+    """Create the client shared by all requests so connections to the BIDS Exporter are reused."""
+    # 解析は時間がかかる可能性があるため、タイムアウトを長めに設定
+    return httpx.AsyncClient(
+        base_url=settings.bids_exporter_url,
+        timeout=httpx.Timeout(settings.bids_request_timeout_seconds, connect=10.0),
+    )
+
+
+async def request_bids_creation(client: httpx.AsyncClient, experiment_id: UUID) -> dict:
     """
     Requests the BIDS Exporter service to create a BIDS dataset for analysis.
     """
-    request_url = f"{settings.bids_exporter_url}/internal/v1/create-bids-for-analysis"
-    payload = {"experiment_id": str(experiment_id)}
-
-    # 解析は時間がかかる可能性があるため、タイムアウトを長めに設定
-    timeout = httpx.Timeout(300.0, connect=10.0)
-
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        try:
-            response = await client.post(request_url, json=payload)
-
-            if response.status_code == 200:
-                return response.json()
-
-            error_detail = response.text
-            raise BidsCreationError(
-                f"BIDS Exporter returned status {response.status_code}: {error_detail}"
-            )
-        except httpx.RequestError as e:
-            raise BidsCreationError(
-                f"Failed to communicate with BIDS Exporter: {e}"
-            ) from e
+    body = orjson.dumps({"experiment_id": str(experiment_id)})
+
+    try:
+        response = await post_with_retry(
+            client,
+            "/internal/v1/create-bids-for-analysis",
+            breaker=_breaker,
+            content=body,
+            # BIDS生成は冪等でなく長時間かかるため、プロキシの 502/504 やタイムアウトでは再送せず、
+            # 確実にサーバーへ届いていない接続失敗のみ再試行する。5xx はブレーカーの失敗に数える
+            retry_exceptions=(httpx.ConnectError,),
+            retry_status_codes=frozenset(),
+            failure_status_codes=SERVER_ERROR_STATUS_CODES,
+        )
+
+        if response.status_code == 200:
+            return orjson.loads(response.content)
+
+        error_detail = response.text
+        raise BidsCreationError(
+            f"BIDS Exporter returned status {response.status_code}: {error_detail}"
+        )
+    except CircuitOpenError as e:
+        raise BidsCreationError(f"BIDS Exporter is temporarily unavailable: {e}") from e
+    except httpx.RequestError as e:
+        raise BidsCreationError(f"Failed to communicate with BIDS Exporter: {e}") from e
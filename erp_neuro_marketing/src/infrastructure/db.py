@@ -1,19 +1,46 @@
-import json
+import threading
 from contextlib import contextmanager
 from datetime import datetime
 from uuid import UUID
 
-import psycopg2
 from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
 
 from ..app.schemas import AnalysisResponse, ProductRecommendation
 from ..config.env import settings
 
+_pool: ThreadedConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadedConnectionPool:
+    """Lazily create the process-wide connection pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    minconn=settings.db_pool_min_connections,
+                    maxconn=settings.db_pool_max_connections,
+                    dsn=settings.database_url,
+                )
+    return _pool
+
+
+def close_db_pool() -> None:
+    """Close every pooled connection; the next get_db_connection call opens a new pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
 
 @contextmanager
 def get_db_connection():
-    """Provides a transactional database connection with automatic commit/rollback."""
-    conn = psycopg2.connect(settings.database_url)
+    """Provides a pooled, transactional database connection with automatic commit/rollback."""
+    pool = _get_pool()
+    conn = pool.getconn()
     try:
         yield conn
         conn.commit()
@@ -21,7 +48,8 @@ def get_db_connection():
         conn.rollback()
         raise
     finally:
-        conn.close()
+        # 切断済みの接続はプールへ戻さずに破棄する
+        pool.putconn(conn, close=bool(conn.closed))
 
 
 @contextmanager
@@ -58,11 +86,11 @@ def get_product_details_from_db(
         return [ProductRecommendation(**dict(row)) for row in rows]
 
 
-def save_analysis_result(result: AnalysisResponse, requested_by_user_id: str) -> None:
-    payload = {
-        "summary": result.summary,
-        "recommendations": [rec.dict() for rec in result.recommendations],
-    }
+def save_analysis_result(
+    result: AnalysisResponse, requested_by_user_id: str, summary_key: str | None = None
+) -> None:
+    # result_data には summary と recommendations、サマリー再利用用のキーのみを保存する
+    payload = result.model_dump_json(include={"summary", "recommendations"})
 
     with get_db_connection() as conn:
         with get_db_cursor(conn) as cur:
@@ -75,17 +103,44 @@ def save_analysis_result(result: AnalysisResponse, requested_by_user_id: str) ->
                     result_data,
                     completed_at
                 )
-                VALUES (%s, %s, %s, %s, NOW())
+                VALUES (
+                    %s,
+                    %s,
+                    %s,
+                    %s::jsonb || jsonb_build_object('summary_key', %s::text),
+                    NOW()
+                )
                 """,
                 (
                     str(result.experiment_id),
                     requested_by_user_id,
                     "completed",
-                    json.dumps(payload),
+                    payload,
+                    summary_key,
                 ),
             )
 
 
+def get_cached_summary(experiment_id: UUID, summary_key: str) -> str | None:
+    """Return the latest stored AI summary generated for the same recommendation set."""
+    with get_db_connection() as conn:
+        with get_db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT result_data->>'summary' AS summary
+                FROM erp_analysis_results
+                WHERE experiment_id = %s
+                  AND status = 'completed'
+                  AND result_data->>'summary_key' = %s
+                ORDER BY completed_at DESC NULLS LAST, created_at DESC
+                LIMIT 1
+                """,
+                (str(experiment_id), summary_key),
+            )
+            row = cur.fetchone()
+            return row["summary"] if row else None
+
+
 def get_latest_analysis_result(experiment_id: UUID) -> dict | None:
     with get_db_connection() as conn:
         with get_db_cursor(conn) as cur:
@@ -94,7 +149,9 @@ def get_latest_analysis_result(experiment_id: UUID) -> dict | None:
                 SELECT analysis_id,
                        experiment_id,
                        requested_by_user_id,
-                       result_data,
+                       COALESCE(result_data->>'summary', '') AS summary,
+                       COALESCE(result_data->'recommendations', '[]'::jsonb)::text
+                           AS recommendations_json,
                        completed_at,
                        created_at
                 FROM erp_analysis_results
@@ -109,14 +166,14 @@ def get_latest_analysis_result(experiment_id: UUID) -> dict | None:
             if not row:
                 return None
 
-            result_data = row["result_data"] or {}
             generated_at: datetime | None = row["completed_at"] or row["created_at"]
 
             return {
                 "analysis_id": row["analysis_id"],
                 "experiment_id": UUID(str(row["experiment_id"])),
                 "requested_by_user_id": row["requested_by_user_id"],
-                "summary": result_data.get("summary", ""),
-                "recommendations": result_data.get("recommendations", []),
+                "summary": row["summary"],
+                # JSON のまま返し、呼び出し側で Pydantic に直接検証させる
+                "recommendations_json": row["recommendations_json"],
                 "generated_at": generated_at,
             }
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+# --- ロガー設定 ---
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+RETRYABLE_STATUS_CODES = frozenset({502, 503, 504})
+SERVER_ERROR_STATUS_CODES = frozenset(range(500, 600))
+# リクエストが相手に届いていないことが確実な例外のみ再試行する (読み取りタイムアウトは再送しない)
+RETRYABLE_EXCEPTIONS: tuple[type[httpx.RequestError], ...] = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+    pass
+
+
+class CircuitBreaker:
+    """
+    連続失敗が閾値に達すると一定時間呼び出しを遮断し、その後1件だけ試行を許可する
+    (closed → open → half-open) シンプルなサーキットブレーカー。
+    イベントループ上からのみ使う前提のためロックは持たない。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._consecutive_failures = 0
+        self._opened_at: float | None = None
+
+    def allow_request(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return False
+        # half-open: 復旧確認のため1件だけ通し、結果が出るまで (最長 reset_timeout) 他は遮断する
+        self._opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("Circuit '%s' closed after a successful call.", self.name)
+        self._consecutive_failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self._opened_at is not None:
+            # 遮断中 (half-open の試行を含む) の失敗は遮断期間を延長する
+            self._opened_at = time.monotonic()
+        elif self._consecutive_failures >= self.failure_threshold:
+            logger.warning(
+                "Circuit '%s' opened after %d consecutive failures.",
+                self.name,
+                self._consecutive_failures,
+            )
+            self._opened_at = time.monotonic()
+
+
+async def post_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    breaker: CircuitBreaker,
+    content: bytes,
+    headers: dict[str, str] = JSON_HEADERS,
+    max_attempts: int = 3,
+    initial_delay: float = 0.2,
+    retry_exceptions: tuple[type[httpx.RequestError], ...] = RETRYABLE_EXCEPTIONS,
+    retry_status_codes: frozenset[int] = RETRYABLE_STATUS_CODES,
+    failure_status_codes: frozenset[int] = RETRYABLE_STATUS_CODES,
+) -> httpx.Response:
+    """
+    POST a pre-serialized body (JSON by default) through the circuit breaker, retrying
+    retry_exceptions and retry_status_codes with exponential backoff and jitter.
+    Responses in failure_status_codes count as breaker failures.
+    Raises CircuitOpenError without sending when open.
+    """
+    attempt = 1
+    delay = initial_delay
+    while True:
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit '{breaker.name}' is open.")
+        try:
+            response = await client.post(url, content=content, headers=headers)
+        except httpx.RequestError as exc:
+            breaker.record_failure()
+            if not isinstance(exc, retry_exceptions) or attempt >= max_attempts:
+                raise
+        else:
+            if response.status_code in failure_status_codes:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code not in retry_status_codes or attempt >= max_attempts:
+                return response
+
+        logger.warning(
+            "Request to %s failed (attempt %d/%d). Retrying in about %.2f seconds.",
+            url,
+            attempt,
+            max_attempts,
+            delay,
+        )
+        await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        delay *= 2
+        attempt += 1
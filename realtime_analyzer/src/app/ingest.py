@@ -44,9 +44,14 @@ def parse_eeg_binary_payload_v4(data: bytes) -> dict | None:
             ch_types_str.append(type_map.get(ch_type_int, "misc"))
 
         # Sample structure: signals(ch*2) + accel(6) + gyro(6) + impedance(ch*1)
-        sample_size = (num_channels * 2) + 6 + 6 + num_channels
-        samples_buffer = data[header_size:]
-        num_samples = len(samples_buffer) // sample_size
+        sample_dtype = np.dtype(
+            [
+                ("signals", "<i2", (num_channels,)),
+                ("imu", "V12"),
+                ("impedance", "u1", (num_channels,)),
+            ]
+        )
+        num_samples = (len(data) - header_size) // sample_dtype.itemsize
 
         if num_samples == 0:
             empty_signals = np.empty((0, num_channels), dtype=np.int16)
@@ -60,31 +65,10 @@ def parse_eeg_binary_payload_v4(data: bytes) -> dict | None:
                 "impedance": empty_impedance,
             }
 
-        all_samples_flat = np.frombuffer(
-            samples_buffer,
-            dtype=np.uint8,
-            count=num_samples * sample_size,
-        )
-        samples_matrix = np.lib.stride_tricks.as_strided(
-            all_samples_flat,
-            shape=(num_samples, sample_size),
-            strides=(sample_size, 1),
-        ).copy()
-
-        signal_section = samples_matrix[:, : num_channels * 2]
-        impedance_section = samples_matrix[
-            :,
-            (num_channels * 2) + 12 : (num_channels * 2) + 12 + num_channels,
-        ]
-
-        signal_bytes = signal_section.reshape(-1).tobytes()
-        signals = np.frombuffer(
-            signal_bytes,
-            dtype="<i2",
-            count=num_samples * num_channels,
-        ).reshape(num_samples, num_channels)
-
-        impedance = impedance_section.reshape(num_samples, num_channels).astype(np.uint8)
+        # Read the samples in place as records; both fields are views without byte copies
+        records = np.frombuffer(data, dtype=sample_dtype, count=num_samples, offset=header_size)
+        signals = records["signals"]
+        impedance = records["impedance"]
 
         return {
             "header": {
@@ -47,7 +47,7 @@ def analyze_bids_data(bids_root_path: Path):
         # 3. eegディレクトリ内のファイル名から最初のタスク名を見つける
         eeg_dir = subject_path / f"ses-{session_id}" / "eeg"
         task_name = None
-        for f in eeg_dir.glob("*_eeg.edf"):
+        for f in [*eeg_dir.glob("*_eeg.vhdr"), *eeg_dir.glob("*_eeg.edf")]:
             match = re.search(r"task-([a-zA-Z0-9]+)_", f.name)
             if match:
                 task_name = match.group(1)
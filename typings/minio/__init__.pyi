@@ -7,4 +7,7 @@ class Minio:
     def get_object(self, *args: Any, **kwargs: Any) -> Any: ...
     def fget_object(self, *args: Any, **kwargs: Any) -> None: ...
     def fput_object(self, *args: Any, **kwargs: Any) -> None: ...
+    def put_object(self, *args: Any, **kwargs: Any) -> Any: ...
     def remove_object(self, *args: Any, **kwargs: Any) -> None: ...
+    def stat_object(self, *args: Any, **kwargs: Any) -> Any: ...
+    def presigned_get_object(self, *args: Any, **kwargs: Any) -> str: ...
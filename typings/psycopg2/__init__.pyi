@@ -1,6 +1,7 @@
 from typing import Any
 
 class Connection:
+    closed: int
     def cursor(self, *args: Any, **kwargs: Any) -> Any: ...
     def commit(self) -> None: ...
     def rollback(self) -> None: ...
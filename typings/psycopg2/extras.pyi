@@ -1 +1,2 @@
 class DictCursor: ...
+class RealDictCursor: ...
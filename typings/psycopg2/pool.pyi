@@ -0,0 +1,11 @@
+from typing import Any
+
+from . import Connection
+
+class PoolError(Exception): ...
+
+class ThreadedConnectionPool:
+    def __init__(self, minconn: int, maxconn: int, *args: Any, **kwargs: Any) -> None: ...
+    def getconn(self, key: Any = None) -> Connection: ...
+    def putconn(self, conn: Connection, key: Any = None, close: bool = False) -> None: ...
+    def closeall(self) -> None: ...
@@ -4,9 +4,16 @@ from typing import Any
 class BaseModel:
     def __init__(self, **data: Any) -> None: ...
     def model_dump(self, *args: Any, **kwargs: Any) -> dict[str, Any]: ...
+    def model_dump_json(self, *args: Any, **kwargs: Any) -> str: ...
     def dict(self, *args: Any, **kwargs: Any) -> dict[str, Any]: ...
 
 def Field(*args: Any, **kwargs: Any) -> Any: ...
+def ConfigDict(**kwargs: Any) -> dict[str, Any]: ...
+
+class TypeAdapter:
+    def __init__(self, type: Any, *args: Any, **kwargs: Any) -> None: ...
+    def validate_python(self, obj: Any, *args: Any, **kwargs: Any) -> Any: ...
+    def validate_json(self, data: str | bytes, *args: Any, **kwargs: Any) -> Any: ...
 
 class ValidationError(Exception):
     def errors(self) -> list[Mapping[str, Any]]: ...